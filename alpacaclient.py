@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import paperconfig
+from ratelimit import TokenBucket
+
+class AlpacaClient:
+    #One keep-alive requests.Session per host (market data and paper trading), each with its own connection pool and
+    #token bucket, and the one retry policy every pipeline stage used to copy: 404 -> None, 429 -> drain the bucket and
+    #back off, other request errors retried with exponential backoff, empty bodies -> {} for DELETE and None otherwise.
+    DATA_HOST = "https://data.alpaca.markets"
+    PAPER_HOST = "https://paper-api.alpaca.markets"
+    REQUESTS_PER_MINUTE = {DATA_HOST: 200, PAPER_HOST: 200} #Alpaca budgets per API on our plan
+    REQUEST_BURST = 10
+
+    def __init__(self, headers=None, pool_connections=2, pool_maxsize=16, timeout=10, max_retries=8, backoff=0.25, max_wait=60, limiters=None):
+        self.headers = headers if headers is not None else paperconfig.header
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.limiters = limiters if limiters is not None else {
+            host: TokenBucket.per_minute(budget, burst=self.REQUEST_BURST) for host, budget in self.REQUESTS_PER_MINUTE.items()
+        }
+        self._sessions = {}
+        self._latency = defaultdict(lambda: {"requests": 0, "retries": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0})
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session(self, host):
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount(host, adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def _record(self, host, seconds=None, retry=False, error=False):
+        with self._lock:
+            stats = self._latency[host]
+            if seconds is not None:
+                stats["requests"] += 1
+                stats["seconds"] += seconds
+                stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["retries"] += retry
+            stats["errors"] += error
+
+    def request(self, method, url, **kw):
+        host = self.host(url)
+        session = self.session(host)
+        limiter = self.limiters.get(host)
+
+        for attempt in range(self.max_retries):
+            try:
+                if limiter is not None:
+                    limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    r = session.request(method, url, timeout=self.timeout, **kw)
+                finally:
+                    self._record(host, time.perf_counter() - start)
+
+                if r.status_code == 404:
+                    return None
+
+                if r.status_code == 429:
+                    if limiter is not None:
+                        limiter.drain()
+                    wait = min(self.max_wait, self.backoff * (2 ** attempt))
+                    print(f"[429 Error] waiting {wait} seconds - {url}")
+                    self._record(host, retry=True)
+                    time.sleep(wait)
+                    continue
+
+                r.raise_for_status()
+
+                if not r.content or r.status_code == 204:
+                    return {} if method == "DELETE" else None
+
+                return r.json()
+
+            except requests.RequestException as e:
+                if attempt == self.max_retries - 1:
+                    print(f"[ERROR] {url} - {e}")
+                    self._record(host, error=True)
+                    return None
+                self._record(host, retry=True)
+                time.sleep(self.backoff * (2 ** attempt))
+
+        self._record(host, error=True)
+        return None
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+    def stats(self):
+        with self._lock:
+            return {
+                host: {
+                    "requests": s["requests"],
+                    "retries": s["retries"],
+                    "errors": s["errors"],
+                    "mean_ms": round(s["seconds"] / s["requests"] * 1000, 1) if s["requests"] else 0.0,
+                    "max_ms": round(s["max_seconds"] * 1000, 1),
+                }
+                for host, s in self._latency.items()
+            }
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+
+def quote_field(js, symbol, field):
+    #One field of a symbol's entry in a quotes/latest response, None when the response or the quote is missing
+    try:
+        return js["quotes"][symbol][field]
+    except (KeyError, TypeError):
+        return None
+
+#Seconds a quote may be used for pricing in a stage that sleeps between rows (the opener polls each order for up to
+#10 s, the reconciler waits 2 s after cancelling a partial fill)
+QUOTE_MAX_AGE = 3
+
+class QuoteBatch:
+    #Latest option quotes for every symbol a stage registers up front. The first lookup fetches all registered symbols
+    #in comma-separated chunks of CHUNK_SIZE and later lookups are served from memory; a symbol that was not registered
+    #is fetched together with whatever else is still pending. With max_age set, a lookup of a quote older than max_age
+    #seconds refetches it along with every other registered quote that has gone stale.
+    URL = f"{AlpacaClient.DATA_HOST}/v1beta1/options/quotes/latest"
+    CHUNK_SIZE = 100
+
+    def __init__(self, client, symbols=(), max_age=None):
+        self.client = client
+        self.max_age = max_age
+        self.quotes = {}
+        self._pending = {}
+        self._fetched = {}
+        self._lock = threading.Lock()
+        self.add(symbols)
+
+    def add(self, symbols):
+        with self._lock:
+            for symbol in symbols:
+                if isinstance(symbol, str) and symbol and symbol not in self._fetched:
+                    self._pending[symbol] = None
+
+    def fetch(self):
+        with self._lock:
+            pending = list(self._pending)
+            self._pending = {}
+            for i in range(0, len(pending), self.CHUNK_SIZE):
+                chunk = pending[i:i + self.CHUNK_SIZE]
+                js = self.client.get(f"{self.URL}?symbols={','.join(chunk)}&feed=indicative")
+                if js:
+                    self.quotes.update(js.get("quotes") or {})
+                fetched_at = time.monotonic()
+                self._fetched.update(dict.fromkeys(chunk, fetched_at))
+
+    def expire(self):
+        #Moves every quote older than max_age back to pending so the next fetch refreshes it
+        if self.max_age is None:
+            return
+        with self._lock:
+            cutoff = time.monotonic() - self.max_age
+            for symbol in [s for s, fetched_at in self._fetched.items() if fetched_at < cutoff]:
+                del self._fetched[symbol]
+                self.quotes.pop(symbol, None)
+                self._pending[symbol] = None
+
+    def get(self, symbol, field):
+        self.expire()
+        if symbol not in self._fetched:
+            self.add([symbol])
+            self.fetch()
+        return quote_field({"quotes": self.quotes}, symbol, field)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def shared_client():
+    #Every stage in the process talks to Alpaca through this one client, so its pools and budgets are shared
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AlpacaClient()
+        return _shared
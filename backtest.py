@@ -0,0 +1,85 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+from instrumentation import SpanRecorder
+from marketdata import FixtureStore, ReplayCalendar, ReplaySource
+from screener import Screener
+
+#Replays recorded scan days (one fixture directory per date) through the live Screener with as_of set to each day, so
+#DTEs, expiry choice and the 30-day volatility windows are computed from what was known at that close. Days are
+#independent and CPU-bound once on disk, so they are spread over processes.
+#
+#With RECORD_FIXTURES on, the executor records every production scan into /data/Fixtures/<date> (pruned to
+#FIXTURES_MAX_BYTES, oldest days first), so the history builds up one trading day at a time; otherwise fixtures must
+#be recorded daily with `benchmarks.py record`. Production scans run with early rejection, so tickers that failed the
+#live avg-volume threshold have no chains on disk and a backtest with a looser volume threshold sees them as errors.
+#`benchmarks.py record` writes a full recording of one day with early rejection off.
+
+def recorded_days(root, start=None, end=None):
+    days = []
+    for directory in sorted(Path(root).iterdir()):
+        if not (directory / "manifest.json").exists():
+            continue
+        scan_date = FixtureStore(directory).manifest()["scan_date"]
+        if (start is None or scan_date >= start) and (end is None or scan_date <= end):
+            days.append(directory)
+    return days
+
+def backtest_day(directory, thresholds, history_directory=None):
+    manifest = FixtureStore(directory).manifest()
+    scan_date = manifest["scan_date"]
+    as_of = manifest.get("as_of", scan_date)
+    source = ReplaySource(directory, as_of=as_of, history_directory=history_directory)
+    calendar = ReplayCalendar(directory) if ReplayCalendar.recorded(directory) else None
+    app = Screener(scan_date, *thresholds, source=source, calendar=calendar, spans=SpanRecorder(enabled=False), as_of=as_of, scan=False)
+    try:
+        for _ in app.stream_earnings(scan_date):
+            pass
+    except Exception as e:
+        print(f"[backtest {scan_date}] -- {e}")
+
+    metrics = app.metricsDF.copy()
+    trades = app.outputDF.copy()
+    metrics.insert(0, "Scan Date", scan_date)
+    trades.insert(0, "Scan Date", scan_date)
+    return metrics, trades
+
+def _backtest_task(task):
+    return backtest_day(*task)
+
+def run_backtest(root, thresholds, start=None, end=None, processes=None, history_directory=None):
+    #Returns (metrics, trades): every evaluated ticker and the rows that passed, both tagged with their scan date
+    tasks = [(directory, tuple(thresholds), history_directory) for directory in recorded_days(root, start, end)]
+    if processes == 1 or len(tasks) <= 1:
+        results = [_backtest_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_backtest_task, tasks))
+
+    metrics = pd.concat([m for m, _ in results], ignore_index=True) if results else pd.DataFrame(columns=["Scan Date"] + Screener.METRICS_COLUMNS)
+    trades = pd.concat([t for _, t in results], ignore_index=True) if results else pd.DataFrame(columns=["Scan Date"] + Screener.OUTPUT_COLUMNS)
+    return metrics, trades
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the screener over recorded past scan days")
+    parser.add_argument("fixtures", help="Directory holding one recorded fixture directory per scan date")
+    parser.add_argument("--start", help="First scan date, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last scan date, YYYY-MM-DD")
+    parser.add_argument("--history", help="Directory of long <SYMBOL>.pkl daily bars for symbols a day did not record")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--volume", type=float, default=1500000)
+    parser.add_argument("--iv30-rv30", type=float, default=1.25)
+    parser.add_argument("--ts-slope", type=float, default=-0.00406)
+    parser.add_argument("--out", default="Backtest", help="Prefix for the <out>Metrics.csv and <out>Trades.csv outputs")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    metrics, trades = run_backtest(args.fixtures, (args.volume, args.iv30_rv30, args.ts_slope), args.start, args.end, args.processes, args.history)
+    metrics.to_csv(f"{args.out}Metrics.csv", index=False)
+    trades.to_csv(f"{args.out}Trades.csv", index=False)
+    print(f"Backtested {metrics['Scan Date'].nunique()} Days, {len(metrics)} Tickers, {len(trades)} Trades in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
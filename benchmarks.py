@@ -0,0 +1,279 @@
+import argparse
+import json
+import random
+import resource
+import string
+import time
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+from scipy.interpolate import interp1d
+from chainkernel import atm_term_structure
+from earningscalendar import parse_earnings_html
+from marketdata import FixtureStore, OptionChain, RecordingSource, ReplayCalendar, ReplaySource, YahooSource
+from screener import Screener
+from termstructure import TermStructure
+
+def soup_parse_earnings_html(html):
+    #The BeautifulSoup parse fetch_earnings_data used before earningscalendar.py, kept as the reference implementation
+    soup = BeautifulSoup(html, 'html.parser')
+    earnings = {}
+    for row in soup.find_all('tr'):
+        if not row.find('span', class_='earnCalCompanyName'):
+            continue
+        try:
+            ticker = row.find('a', class_='bold').text.strip().upper()
+            tt_span = row.find('span', class_='genToolTip')
+            tooltip = tt_span.get('data-tooltip', '').strip() if tt_span else ''
+            if tooltip == 'Before market open':
+                etime = 'Pre Market'
+            elif tooltip == 'After market close':
+                etime = 'Post Market'
+            else:
+                etime = 'During Market'
+            earnings[ticker] = etime
+        except Exception:
+            continue
+    return earnings
+
+def synthetic_calendar_html(rows, seed=7):
+    rng = random.Random(seed)
+    tooltips = ['Before market open', 'After market close', '']
+    parts = ['<tr><td colspan="9" class="theDay">Thursday, July 31, 2025</td></tr>']
+    for i in range(rows):
+        ticker = "".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(1, 5))) + str(i)
+        tooltip = rng.choice(tooltips)
+        tip = f'<span class="genToolTip oneliner reverseToolTip" data-tooltip="{tooltip}"><i class="marketOpen"></i></span>' if tooltip else ''
+        parts.append(
+            f'<tr><td class="flag"><span title="United States" class="ceFlags USA middle inlineblock"></span></td>'
+            f'<td class="left noWrap earnCalCompanyName middle" title="{ticker} Holdings &amp; Co">'
+            f'<span class="earnCalCompanyName middle">{ticker} Holdings &amp; Co</span>&nbsp;'
+            f'(<a href="/equities/{ticker.lower()}-holdings" class="bold middle">{ticker}</a>)</td>'
+            f'<td class="leftStrong">--</td><td class="leftStrong">/&nbsp;&nbsp;{rng.uniform(-1, 5):.2f}</td>'
+            f'<td class="leftStrong">--</td><td class="leftStrong">/&nbsp;&nbsp;{rng.uniform(1, 900):.2f}M</td>'
+            f'<td class="right">{rng.uniform(0.1, 900):.2f}B</td><td class="right time">{tip}</td></tr>'
+        )
+    return "".join(parts)
+
+def load_payloads(directory):
+    payloads = []
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path) as f:
+            payloads.append((path.name, json.load(f)["data"]))
+    return payloads
+
+def bench_calendar(args):
+    if args.payloads:
+        payloads = load_payloads(args.payloads)
+    else:
+        payloads = [(f"synthetic-{args.rows}-rows", synthetic_calendar_html(args.rows))]
+
+    for name, html in payloads:
+        fast = parse_earnings_html(html)
+        reference = soup_parse_earnings_html(html)
+        if fast != reference:
+            raise SystemExit(f"{name}: parsers disagree on {len(set(fast.items()) ^ set(reference.items()))} rows")
+
+        soup_time = min(timeit.repeat(lambda: soup_parse_earnings_html(html), number=1, repeat=args.repeat))
+        fast_time = min(timeit.repeat(lambda: parse_earnings_html(html), number=1, repeat=args.repeat))
+        print(f"{name}: {len(fast)} rows | BeautifulSoup {soup_time * 1000:.1f} ms | Streaming {fast_time * 1000:.1f} ms | {soup_time / fast_time:.1f}x")
+
+def pandas_atm_term_structure(chains, underlying_price):
+    #The per-expiry pandas loop compute_recommendation ran before chainkernel.py, kept as the reference implementation
+    atm_iv = {}
+    straddle = None
+    i = 0
+    for exp_date, chain in chains.items():
+        calls = chain.calls
+        puts = chain.puts
+        if calls.empty or puts.empty:
+            continue
+        call_idx = (calls['strike'] - underlying_price).abs().idxmin()
+        put_idx = (puts['strike'] - underlying_price).abs().idxmin()
+        atm_iv[exp_date] = (calls.loc[call_idx, 'impliedVolatility'] + puts.loc[put_idx, 'impliedVolatility']) / 2.0
+        if i == 0:
+            call_mid = (calls.loc[call_idx, 'bid'] + calls.loc[call_idx, 'ask']) / 2.0
+            put_mid = (puts.loc[put_idx, 'bid'] + puts.loc[put_idx, 'ask']) / 2.0
+            straddle = call_mid + put_mid
+        i += 1
+    return list(atm_iv), np.array(list(atm_iv.values())), straddle
+
+def synthetic_chains(expiries, strikes, price, seed=7):
+    rng = np.random.default_rng(seed)
+    grid = np.round(np.linspace(price * 0.3, price * 1.7, strikes) * 2) / 2
+
+    def side():
+        mid = rng.uniform(0.05, 30, strikes)
+        return pd.DataFrame({
+            'contractSymbol': [f"XYZ{k:08.0f}" for k in grid * 1000],
+            'strike': grid,
+            'bid': mid * 0.95,
+            'ask': mid * 1.05,
+            'impliedVolatility': rng.uniform(0.2, 1.5, strikes),
+            'volume': rng.integers(0, 5000, strikes),
+        })
+
+    return {f"2025-{1 + e // 4:02d}-{1 + 7 * (e % 4):02d}": OptionChain(side(), side()) for e in range(expiries)}
+
+def bench_chain(args):
+    price = 101.37
+    for expiries in args.expiries:
+        chains = synthetic_chains(expiries, args.strikes, price)
+        reference = pandas_atm_term_structure(chains, price)
+        kernel = atm_term_structure(chains, price)
+        if reference[0] != kernel[0] or not np.array_equal(reference[1], kernel[1]) or reference[2] != kernel[2]:
+            raise SystemExit(f"{expiries} expiries: kernel and pandas loop disagree")
+
+        pandas_time = min(timeit.repeat(lambda: pandas_atm_term_structure(chains, price), number=10, repeat=args.repeat)) / 10
+        kernel_time = min(timeit.repeat(lambda: atm_term_structure(chains, price), number=10, repeat=args.repeat)) / 10
+        print(f"{expiries} expiries x {args.strikes} strikes: pandas loop {pandas_time * 1e6:.0f} us | NumPy kernel {kernel_time * 1e6:.0f} us | {pandas_time / kernel_time:.1f}x")
+
+def interp1d_term_structure(days, ivs):
+    #The closure build_term_structure returned before termstructure.py, kept as the reference implementation
+    days = np.array(days)
+    ivs = np.array(ivs)
+    sort_idx = days.argsort()
+    days = days[sort_idx]
+    ivs = ivs[sort_idx]
+    spline = interp1d(days, ivs, kind='linear', fill_value="extrapolate")
+
+    def term_spline(dte):
+        if dte < days[0]:
+            return ivs[0]
+        elif dte > days[-1]:
+            return ivs[-1]
+        else:
+            return float(spline(dte))
+
+    return term_spline
+
+def synthetic_term_structures(tickers, seed=7):
+    rng = np.random.default_rng(seed)
+    days_list = []
+    ivs_list = []
+    for _ in range(tickers):
+        n = int(rng.integers(2, 13))
+        days_list.append(np.sort(rng.choice(np.arange(1, 400), n, replace=False)).tolist())
+        ivs_list.append(rng.uniform(0.15, 2.5, n))
+    return days_list, ivs_list
+
+def bench_termstructure(args):
+    days_list, ivs_list = synthetic_term_structures(args.tickers)
+
+    def closures():
+        out = []
+        for days, ivs in zip(days_list, ivs_list):
+            spline = interp1d_term_structure(days, ivs)
+            out.append((spline(45), spline(days[0]), spline(30)))
+        return np.array(out, dtype=np.float64)
+
+    def per_ticker():
+        return np.array([TermStructure(days, ivs)([45, days[0], 30]) for days, ivs in zip(days_list, ivs_list)])
+
+    def batch():
+        return TermStructure.batch(days_list, ivs_list)([45, 30])
+
+    reference = closures()
+    if not np.array_equal(reference, per_ticker()) or not np.array_equal(reference[:, [0, 2]], batch()):
+        raise SystemExit("TermStructure and the interp1d closure disagree")
+
+    timings = [(name, min(timeit.repeat(fn, number=1, repeat=args.repeat))) for name, fn in
+               (("interp1d closures", closures), ("TermStructure per ticker", per_ticker), ("TermStructure batch", batch))]
+    print(f"{args.tickers} tickers: " + " | ".join(f"{name} {t * 1000:.1f} ms ({timings[0][1] / t:.1f}x)" for name, t in timings))
+
+def record_scan(args):
+    #Runs a full live scan with early rejection off, so every chain any threshold could need lands in the fixtures
+    source = RecordingSource(YahooSource(), args.directory)
+    app = Screener(args.date, 0, 0, 0, max_workers=args.workers, chain_workers=args.chain_workers, early_reject=False, source=source, scan=False)
+    as_of = app.today().strftime("%Y-%m-%d")
+    for _ in app.stream_earnings(args.date):
+        pass
+
+    source.store.write_manifest({
+        "scan_date": args.date,
+        "as_of": as_of,
+        "recorded_at": datetime.now().isoformat(),
+        "tickers": app.metricsDF["Ticker"].tolist(),
+    })
+    print(f"Recorded {len(app.metricsDF)} tickers for {args.date} into {args.directory}")
+
+def peak_rss_mb():
+    #ru_maxrss is the process high-water mark in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def scan_fixture(directory, args):
+    #Every repeat of one fixture directory; runs in its own process so peak_rss_mb is that day's high-water mark
+    thresholds = (args.volume, args.iv30_rv30, args.ts_slope)
+    manifest = FixtureStore(directory).manifest()
+    scan_date = manifest["scan_date"]
+    #Production fixtures hold each day's earnings map rather than the calendar pages
+    calendar = ReplayCalendar(directory) if ReplayCalendar.recorded(directory) else None
+    walls = []
+    for _ in range(args.repeat):
+        app = Screener(scan_date, *thresholds, max_workers=args.workers, chain_workers=args.chain_workers,
+                       source=ReplaySource(directory, latency=args.latency), calendar=calendar, as_of=manifest["as_of"], scan=False)
+        start = time.perf_counter()
+        for _ in app.stream_earnings(scan_date):
+            pass
+        walls.append(time.perf_counter() - start)
+
+    summary = app.spans.summary()
+    tickers = summary.loc["ticker"] if "ticker" in summary.index else None
+    return (f"{scan_date} ({len(app.metricsDF)} tickers, {len(app.outputDF)} passed, {args.workers} workers, {args.latency * 1000:.0f} ms latency): "
+            f"wall {min(walls):.2f} s best / {sum(walls) / len(walls):.2f} s mean | "
+            + (f"per ticker p50 {tickers['p50_ms']:.1f} ms, p95 {tickers['p95_ms']:.1f} ms, max {tickers['max_ms']:.1f} ms | " if tickers is not None else "")
+            + f"peak RSS {peak_rss_mb():.0f} MB")
+
+def bench_scan(args):
+    for directory in args.fixtures:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            print(pool.submit(scan_fixture, directory, args).result())
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the screening pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calendar = commands.add_parser("calendar", help="Earnings calendar HTML parsing")
+    calendar.add_argument("--payloads", help="Directory of saved getCalendarFilteredData JSON responses")
+    calendar.add_argument("--rows", type=int, default=600, help="Rows in the synthetic day when no payloads are given")
+    calendar.add_argument("--repeat", type=int, default=20)
+    calendar.set_defaults(run=bench_calendar)
+
+    chain = commands.add_parser("chain", help="ATM strike selection and straddle pricing over option chains")
+    chain.add_argument("--expiries", type=int, nargs="+", default=[1, 6, 12])
+    chain.add_argument("--strikes", type=int, default=120, help="Strikes per side of each expiry")
+    chain.add_argument("--repeat", type=int, default=5)
+    chain.set_defaults(run=bench_chain)
+
+    termstructure = commands.add_parser("termstructure", help="IV term structure evaluation at the front, 30 and 45 DTE")
+    termstructure.add_argument("--tickers", type=int, default=500)
+    termstructure.add_argument("--repeat", type=int, default=5)
+    termstructure.set_defaults(run=bench_termstructure)
+
+    record = commands.add_parser("record", help="Record a live scan's calendar, chains and history into a fixture directory")
+    record.add_argument("date", help="Scan date, YYYY-MM-DD")
+    record.add_argument("directory")
+    record.add_argument("--workers", type=int, default=8)
+    record.add_argument("--chain-workers", type=int, default=4)
+    record.set_defaults(run=record_scan)
+
+    scan = commands.add_parser("scan", help="Replay recorded scans through the Screener")
+    scan.add_argument("fixtures", nargs="+", help="Fixture directories written by the record command")
+    scan.add_argument("--workers", type=int, default=8)
+    scan.add_argument("--chain-workers", type=int, default=4)
+    scan.add_argument("--latency", type=float, default=0.0, help="Seconds slept before every replayed call")
+    scan.add_argument("--volume", type=float, default=1500000)
+    scan.add_argument("--iv30-rv30", type=float, default=1.25)
+    scan.add_argument("--ts-slope", type=float, default=-0.00406)
+    scan.add_argument("--repeat", type=int, default=3)
+    scan.set_defaults(run=bench_scan)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
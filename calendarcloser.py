@@ -1,21 +1,21 @@
-import time, requests
-import paperconfig
+from alpacaclient import QuoteBatch, shared_client
 
 class CalendarCloser:
     PAPER_DOMAIN = "https://paper-api.alpaca.markets"
-    QUOTES = "https://data.alpaca.markets/v1beta1/options/quotes/latest?symbols={sym}&feed=indicative"
 
-    def __init__(self,reconciled_df):
+    def __init__(self,reconciled_df, client=None):
         self.df = reconciled_df.copy()
-        self.rate_delay = 0.25
-        self.max_retries = 8
-        self.max_wait = 60
-        self.hdr = paperconfig.header
+        self.client = client if client is not None else shared_client()
+        self.quotes = QuoteBatch(self.client)
 
     def run(self):
+        if self.df.empty or not {"Front Symbol", "Back Symbol"}.issubset(self.df.columns):
+            print("No Positions To Close")
+            return
+
+        self.quotes = QuoteBatch(self.client, [*self.df["Front Symbol"], *self.df["Back Symbol"]])
         for _, row in self.df.iterrows():
             self.close_position(row)
-            time.sleep(self.rate_delay)
 
     def close_position(self, row):
         front = row["Front Symbol"]
@@ -111,60 +111,14 @@ class CalendarCloser:
             return
         
     def get_quote_data(self, symbol, field):
-        url = self.QUOTES.format(sym=symbol)
-        for attempt in range(self.max_retries):
-            try:
-                r = requests.get(url, headers=self.hdr, timeout=10)
-
-                if r.status_code == 404:
-                    return None
-
-                if r.status_code == 429:
-                    wait = min(self.max_wait, self.rate_delay * (2 ** attempt))
-                    print(f"[429 Error] waiting {wait} seconds - {url}")
-                    time.sleep(wait)
-                    continue
-                
-                r.raise_for_status()
-                js = r.json()
-                return js["quotes"][symbol][field]
-            
-            except Exception as e:
-                if attempt == self.max_retries - 1:
-                    print(f"[ERROR] {url} - {e}")
-                    return None
-                time.sleep(self.rate_delay * (2 ** attempt))
-
-        return None
+        return self.quotes.get(symbol, field)
 
     def submit_order(self, body):
         url = f"{self.PAPER_DOMAIN}/v2/orders"
         return self.request("POST", url, json=body)
 
     def request(self, method, url, **kw):
-        for attempt in range(self.max_retries):
-            try:
-                r = requests.request(method, url, headers=self.hdr, timeout=10, **kw)
-
-                if r.status_code == 404:
-                    return None
-
-                if r.status_code == 429:
-                    wait = min(self.max_wait, self.rate_delay * (2 ** attempt))
-                    print(f"[429 Error] waiting {wait} seconds - {url}")
-                    time.sleep(wait)
-                    continue
-
-                r.raise_for_status()
-                return r.json()
-
-            except requests.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    print(f"[ERROR] {url} - {e}")
-                    return None
-                time.sleep(self.rate_delay * (2 ** attempt))
-
-        return None
+        return self.client.request(method, url, **kw)
 
 # def main():
 #     rec_df = pd.read_csv("FilteredOrders.csv")
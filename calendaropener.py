@@ -1,18 +1,16 @@
-import time, requests
+import time
 from typing import List, Dict
 import pandas as pd
-import paperconfig 
+from alpacaclient import QUOTE_MAX_AGE, QuoteBatch, shared_client
 
 class CalendarOpener:
     PAPER_DOMAIN = "https://paper-api.alpaca.markets"
-    QUOTES = "https://data.alpaca.markets/v1beta1/options/quotes/latest?symbols={sym}&feed=indicative"
+    OUTPUT_COLS = ["Order ID", "Quantity", "Front Symbol", "Back Symbol", "Limit Price", "Filled"]
 
-    def __init__(self, enriched_df):
+    def __init__(self, enriched_df, client=None):
         self.df = enriched_df.copy()
-        self.rate_delay = 0.25
-        self.max_retries = 8
-        self.max_wait = 60
-        self.hdr = paperconfig.header
+        self.client = client if client is not None else shared_client()
+        self.quotes = QuoteBatch(self.client)
 
         self.df.sort_values("TS Slope", inplace=True)
 
@@ -24,16 +22,20 @@ class CalendarOpener:
 
     
     def run(self):
+        if self.df.empty or not {"Front Symbol", "Back Symbol"}.issubset(self.df.columns):
+            print("No Sized Trades To Open")
+            return pd.DataFrame(columns=self.OUTPUT_COLS)
+
+        self.quotes = QuoteBatch(self.client, [*self.df["Front Symbol"], *self.df["Back Symbol"]], max_age=QUOTE_MAX_AGE)
         for _, row in self.df.iterrows():
             if self.capital_left < 10: 
                 break
 
             self.execute_trade(row)
-            time.sleep(self.rate_delay)
         
         print(f"\nRemaining capital: ${self.capital_left:,.2f}")
             
-        toReturn = pd.DataFrame(self.openPositions, columns=["Order ID", "Quantity", "Front Symbol", "Back Symbol", "Limit Price", "Filled"])
+        toReturn = pd.DataFrame(self.openPositions, columns=self.OUTPUT_COLS)
         return toReturn
 
 
@@ -130,56 +132,10 @@ class CalendarOpener:
             print(f"{ticker} Order Failed - {e}")
 
     def get_quote_data(self, symbol, field):
-        url = self.QUOTES.format(sym=symbol)
-        for attempt in range(self.max_retries):
-            try:
-                r = requests.get(url, headers=self.hdr, timeout=10)
-
-                if r.status_code == 404:
-                    return None
-
-                if r.status_code == 429:
-                    wait = min(self.max_wait, self.rate_delay * (2 ** attempt))
-                    print(f"[429 Error] waiting {wait} seconds - {url}")
-                    time.sleep(wait)
-                    continue
-                
-                r.raise_for_status()
-                js = r.json()
-                return js["quotes"][symbol][field]
-            
-            except Exception as e:
-                if attempt == self.max_retries - 1:
-                    print(f"[ERROR] {url} - {e}")
-                    return None
-                time.sleep(self.rate_delay * (2 ** attempt))
-
-        return None
+        return self.quotes.get(symbol, field)
             
     def request(self, method, url, **kw):
-        for attempt in range(self.max_retries):
-            try:
-                r = requests.request(method, url, headers=self.hdr, timeout=10, **kw)
-
-                if r.status_code == 404:
-                    return None
-
-                if r.status_code == 429:
-                    wait = min(self.max_wait, self.rate_delay * (2 ** attempt))
-                    print(f"[429 Error] waiting {wait} seconds - {url}")
-                    time.sleep(wait)
-                    continue
-
-                r.raise_for_status()
-                return r.json()
-
-            except requests.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    print(f"[ERROR] {url} - {e}")
-                    return None
-                time.sleep(self.rate_delay * (2 ** attempt))
-
-        return None
+        return self.client.request(method, url, **kw)
     
 # def main():
 #     df = pd.read_csv("alpaca_snapshot.csv")
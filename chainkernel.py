@@ -0,0 +1,66 @@
+import numpy as np
+
+class ChainSide:
+    #Strikes of one side (calls or puts) of an expiry as a sorted array. rank holds each sorted row's position in the
+    #original frame, so ties resolve to the row Series.idxmin would have returned and quotes are read from that row.
+    def __init__(self, frame):
+        self.frame = frame
+        strikes = frame['strike'].to_numpy(dtype=np.float64)
+        if np.all(strikes[1:] > strikes[:-1]) and not np.isnan(strikes).any():
+            self.strikes = strikes
+            self.rank = np.arange(len(strikes))
+        else:
+            order = np.argsort(strikes, kind='stable')
+            self.rank = order[~np.isnan(strikes[order])]
+            self.strikes = strikes[self.rank]
+
+    def value(self, column, i):
+        return self.frame[column].to_numpy()[self.rank[i]]
+
+def nearest_strike(strikes, price, rank=None):
+    if len(strikes) == 0 or np.isnan(price):
+        raise ValueError("No strike to match against the underlying price")
+
+    hi = int(np.searchsorted(strikes, price))
+    if hi == len(strikes):
+        return int(np.searchsorted(strikes, strikes[-1]))
+    if hi == 0:
+        return 0
+
+    lo = int(np.searchsorted(strikes, strikes[hi - 1]))
+    lo_diff = abs(strikes[lo] - price)
+    hi_diff = abs(strikes[hi] - price)
+    if lo_diff < hi_diff:
+        return lo
+    if hi_diff < lo_diff:
+        return hi
+    if rank is not None and rank[hi] < rank[lo]:
+        return hi
+    return lo
+
+def atm_term_structure(chains, price):
+    #chains maps expiry -> (calls, puts) frames in expiry order. Returns the expiries that had both sides, their ATM IVs
+    #as one array, and the straddle mid of the first of those expiries (None when there is no such expiry).
+    exp_dates = []
+    call_iv = []
+    put_iv = []
+    straddle = None
+
+    for exp_date, chain in chains.items():
+        if chain.calls.empty or chain.puts.empty:
+            continue
+
+        calls = ChainSide(chain.calls)
+        puts = ChainSide(chain.puts)
+        c = nearest_strike(calls.strikes, price, calls.rank)
+        p = nearest_strike(puts.strikes, price, puts.rank)
+
+        if not exp_dates:
+            straddle = (calls.value('bid', c) + calls.value('ask', c)) / 2.0 + (puts.value('bid', p) + puts.value('ask', p)) / 2.0
+
+        exp_dates.append(exp_date)
+        call_iv.append(calls.value('impliedVolatility', c))
+        put_iv.append(puts.value('impliedVolatility', p))
+
+    atm_iv = (np.array(call_iv, dtype=np.float64) + np.array(put_iv, dtype=np.float64)) / 2.0
+    return exp_dates, atm_iv, straddle
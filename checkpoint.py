@@ -0,0 +1,50 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+class ScanCheckpoint:
+    #Append-only JSONL of finished tickers' metrics rows for one scan date. Every line is flushed and fsynced before
+    #the next ticker is reported, so after a crash the file holds every ticker that finished; a torn last line is
+    #ignored on load and that ticker is simply evaluated again.
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        done = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue
+                    done[row["Ticker"]] = row
+        except FileNotFoundError:
+            pass
+        return done
+
+    def append(self, row):
+        line = json.dumps(row, default=float) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a")
+                if self._file.tell() > 0 and not self._ends_with_newline():
+                    self._file.write("\n")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
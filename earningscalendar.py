@@ -0,0 +1,187 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from pathlib import Path
+
+TIMINGS = {
+    'Before market open': 'Pre Market',
+    'After market close': 'Post Market',
+}
+
+def classify_timing(tooltip):
+    return TIMINGS.get(tooltip, 'During Market')
+
+class CalendarRowParser(HTMLParser):
+    #Single pass over the calendar markup that only tracks what fetch_earnings_data reads from each <tr>: whether it
+    #holds a company name span, the text of its first a.bold, and the data-tooltip of its first span.genToolTip.
+    #Range requests interleave td.theDay header rows, which set the day for the company rows that follow them; rows
+    #before the first header get the day passed in.
+    def __init__(self, day=None):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._in_row = False
+        self._day = day
+        self._day_parts = None
+
+    def _start_row(self):
+        self._in_row = True
+        self._company = False
+        self._ticker_parts = None
+        self._in_ticker = False
+        self._tooltip = None
+
+    def _finish_row(self):
+        if self._in_row and self._company:
+            ticker = None if self._ticker_parts is None else "".join(self._ticker_parts)
+            self.rows.append((self._day, ticker, self._tooltip))
+        self._in_row = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self._finish_row()
+            self._start_row()
+            return
+
+        if not self._in_row or tag not in ('span', 'a', 'td'):
+            return
+
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'td':
+            if 'theDay' in classes:
+                self._day_parts = []
+        elif tag == 'span':
+            if 'earnCalCompanyName' in classes:
+                self._company = True
+            if self._tooltip is None and 'genToolTip' in classes:
+                self._tooltip = attrs.get('data-tooltip') or ''
+        elif self._ticker_parts is None and 'bold' in classes:
+            self._ticker_parts = []
+            self._in_ticker = True
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self._in_ticker = False
+        elif tag == 'td' and self._day_parts is not None:
+            self._set_day("".join(self._day_parts).strip())
+            self._day_parts = None
+        elif tag == 'tr':
+            self._finish_row()
+
+    def handle_data(self, data):
+        if self._in_ticker:
+            self._ticker_parts.append(data)
+        elif self._day_parts is not None:
+            self._day_parts.append(data)
+
+    @property
+    def day(self):
+        return self._day
+
+    def _set_day(self, text):
+        try:
+            self._day = datetime.strptime(text, "%A, %B %d, %Y").strftime("%Y-%m-%d")
+        except ValueError:
+            print(f"[fetch_earnings_data] Unrecognised day header: {text!r}")
+
+    def close(self):
+        super().close()
+        self._finish_row()
+
+def parse_earnings_days(html, default_day=None):
+    return parse_earnings_pages([html], default_day)
+
+def parse_earnings_pages(pages, default_day=None):
+    #Pages of one range response in order. A page that starts mid-day has no header for its first rows, so each page
+    #starts on the last day the previous page set.
+    days = {}
+    day = default_day
+    for html in pages:
+        parser = CalendarRowParser(day)
+        parser.feed(html)
+        parser.close()
+        day = parser.day
+
+        for row_day, ticker, tooltip in parser.rows:
+            if ticker is None:
+                print("[fetch_earnings_data] Row parse error: company row without a ticker link")
+                continue
+            days.setdefault(row_day, {})[ticker.strip().upper()] = classify_timing((tooltip or '').strip())
+    return days
+
+def parse_earnings_html(html):
+    earnings = {}
+    for day_map in parse_earnings_days(html).values():
+        earnings.update(day_map)
+    return earnings
+
+class EarningsCalendarStore:
+    #One JSON file per calendar day. A miss fetches the next days_ahead days in a single range request and stores
+    #every day in it, including days with no rows, so the following runs of the week answer from disk. An incomplete
+    #range is not stored; the missed day is fetched alone instead. A directory of None keeps the days in memory only,
+    #for one process that scans several dates.
+    def __init__(self, directory, days_ahead=7, max_age=timedelta(days=3)):
+        self.directory = Path(directory) if directory is not None else None
+        self.days_ahead = days_ahead
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._days = {}
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, day):
+        return self.directory / f"{day}.json"
+
+    def _load(self, day):
+        if day not in self._days:
+            if self.directory is None:
+                return None
+            try:
+                with open(self._path(day)) as f:
+                    entry = json.load(f)
+                self._days[day] = (datetime.fromisoformat(entry["fetched_at"]), entry["earnings"])
+            except (OSError, ValueError, KeyError):
+                return None
+
+        fetched_at, earnings = self._days[day]
+        if datetime.now() - fetched_at > self.max_age:
+            return None
+        return earnings
+
+    def _save(self, day, fetched_at, earnings):
+        self._days[day] = (fetched_at, earnings)
+        if self.directory is None:
+            return
+        tmp_path = self._path(day).with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": fetched_at.isoformat(), "earnings": earnings}, f)
+        os.replace(tmp_path, self._path(day))
+
+    def get(self, day, fetch_range):
+        with self._lock:
+            earnings = self._load(day)
+            if earnings is not None:
+                self.hits += 1
+                return earnings
+
+            self.misses += 1
+            start = datetime.strptime(day, "%Y-%m-%d").date()
+            end = start + timedelta(days=self.days_ahead - 1)
+            days = fetch_range(day, end.strftime("%Y-%m-%d"))
+            if days is None:
+                #fetch_range returns None for an incomplete response, which is never stored. The day on its own is a
+                #much smaller response, so it is tried before giving up.
+                end = start
+                days = fetch_range(day, day)
+                if days is None:
+                    return {}
+
+            fetched_at = datetime.now()
+            for offset in range((end - start).days + 1):
+                d = (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+                self._save(d, fetched_at, days.get(d, {}))
+            return days.get(day, {})
@@ -2,7 +2,10 @@ import schedule, time, pytz, datetime as dt
 import pandas_market_calendars as mcal
 import pandas as pd
 from screener import Screener
+from marketdata import CachedSource, DataCache, RecordingCalendar, RecordingSource, YahooSource, prune_fixtures
+from earningscalendar import EarningsCalendarStore
 from tradesizing import TradingDataCollector
+from alpacaclient import shared_client
 from calendaropener import CalendarOpener
 from reconciliation import CalendarOpenReconciler
 from calendarcloser import CalendarCloser
@@ -16,13 +19,25 @@ STOP_PIPELINE = False
 VOL_THRESHOLD = 1500000
 IVRV_THRESHOLD = 1.25
 TS_SLOPE_THRESHOLD = -0.00406
+SCREENER_WORKERS = 8
+CHAIN_WORKERS = 4
+SIZER_CONCURRENCY = 8
 
 DATA_DIR = Path("/data")
 
 RAW_SCREENER_CSV = DATA_DIR / "EarningsScanning.csv"
+SCREENER_METRICS_CSV = DATA_DIR / "ScreenerMetrics.csv" #Every evaluated ticker; Screener.refilter re-applies thresholds to it offline
 SIZEDTRADES_CSV  = DATA_DIR / "SizedTrades.csv"
 PLACED_CSV = DATA_DIR / "PlacedOrders.csv"
 FILTERED_CSV = DATA_DIR / "FilteredOrders.csv"
+MARKET_CACHE_DB = DATA_DIR / "MarketDataCache.sqlite"
+EARNINGS_CALENDAR_DIR = DATA_DIR / "EarningsCalendar"
+SCREENER_TIMINGS_DIR = DATA_DIR / "ScreenerTimings" #One JSONL file of phase spans per scan date
+SCREENER_CHECKPOINT_DIR = DATA_DIR / "Checkpoints" #Finished tickers per scan date; a restarted job resumes from it
+FIXTURES_DIR = DATA_DIR / "Fixtures" #Each scan's calendar, chains and bars per scan date, replayed by backtest.py
+
+RECORD_FIXTURES = False #Off by default: recording pickles every chain and bar the scan reads onto the /data volume
+FIXTURES_MAX_BYTES = 512 * 1024 * 1024 #Oldest recorded days are pruned before a new one is recorded
 
 def is_market_day(d=None):
     if d is None:
@@ -47,23 +62,38 @@ def job_closer():
 
 def job_screener_and_sizer():
     print("[3:30] - Screening and Sizing Scripts Executing ...")
-    global STOP_PIPELINE
     if STOP_PIPELINE:
         print("Pipeline Stopped For Today ... Skipping This Step")
         return False
     scan_date = dt.datetime.now(EASTERN).date().strftime("%Y-%m-%d")
-    app = Screener(scan_date, VOL_THRESHOLD, IVRV_THRESHOLD, TS_SLOPE_THRESHOLD)
+    cache = DataCache(MARKET_CACHE_DB)
+    source = CachedSource(YahooSource(), cache)
+    calendar = EarningsCalendarStore(EARNINGS_CALENDAR_DIR)
+    if RECORD_FIXTURES:
+        pruned = prune_fixtures(FIXTURES_DIR, FIXTURES_MAX_BYTES, keep={scan_date})
+        if pruned:
+            print(f"Pruned Fixtures: {', '.join(pruned)}")
+        source = RecordingSource(source, FIXTURES_DIR / scan_date)
+        calendar = RecordingCalendar(calendar, FIXTURES_DIR / scan_date)
+    app = Screener(scan_date, VOL_THRESHOLD, IVRV_THRESHOLD, TS_SLOPE_THRESHOLD, max_workers=SCREENER_WORKERS, chain_workers=CHAIN_WORKERS, source=source, calendar=calendar, checkpoint_dir=SCREENER_CHECKPOINT_DIR, scan=False)
+    sizer = TradingDataCollector(pd.DataFrame(columns=Screener.OUTPUT_COLUMNS), dt.datetime.now(), concurrency=SIZER_CONCURRENCY)
+    enriched = sizer.run_stream(app.stream_earnings(scan_date)) #Sizing starts on each ticker as soon as it passes the screen
+    if RECORD_FIXTURES:
+        source.store.write_manifest({
+            "scan_date": scan_date,
+            "as_of": app.today().strftime("%Y-%m-%d"),
+            "recorded_at": dt.datetime.now().isoformat(),
+            "tickers": app.metricsDF["Ticker"].tolist(),
+        })
+    print(f"Market Data Cache: {cache.stats()}")
+    cache.close()
     app.outputDF.to_csv(RAW_SCREENER_CSV, index=False)
+    app.metricsDF.to_csv(SCREENER_METRICS_CSV, index=False)
+    app.spans.write_jsonl(SCREENER_TIMINGS_DIR / f"{scan_date}.jsonl")
     print("Dataframe After Screening: ")
     print(app.outputDF.to_string())
     print(f"Screener Produced {len(app.outputDF)} Rows")
-    try:
-        df = pd.read_csv(RAW_SCREENER_CSV)
-    except FileNotFoundError:
-        print("No Available Screening Data")
-        STOP_PIPELINE = True
-        return False
-    enriched = TradingDataCollector(df, dt.datetime.now()).run()
+    print(f"Alpaca Client: {shared_client().stats()}")
     enriched.to_csv(SIZEDTRADES_CSV, index=False)
     print("Dataframe After Position Sizing: ")
     print(enriched.to_string())
@@ -0,0 +1,85 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+import pandas as pd
+
+class SpanRecorder:
+    #Wall-clock spans keyed by phase and ticker (or calendar day). Worker threads append to one list under a lock, so
+    #a span costs two perf_counter reads and an append; disabled recorders skip even that.
+    SUMMARY_COLUMNS = ["count", "total_s", "p50_ms", "p95_ms", "max_ms", "errors"]
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase, key=None):
+        if not self.enabled:
+            yield
+            return
+
+        started_at = time.time()
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(phase, key, started_at, time.perf_counter() - start, ok)
+
+    def record(self, phase, key, started_at, seconds, ok=True):
+        entry = {"phase": phase, "key": key, "started_at": started_at, "seconds": seconds,
+                 "thread": threading.current_thread().name, "ok": ok}
+        with self._lock:
+            self.spans.append(entry)
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+    def frame(self):
+        with self._lock:
+            spans = list(self.spans)
+        return pd.DataFrame(spans, columns=["phase", "key", "started_at", "seconds", "thread", "ok"])
+
+    def summary(self):
+        spans = self.frame()
+        if spans.empty:
+            return pd.DataFrame(columns=self.SUMMARY_COLUMNS, dtype=float)
+
+        by_phase = spans.groupby("phase", sort=False)
+        seconds = by_phase["seconds"]
+        return pd.DataFrame({
+            "count": seconds.size(),
+            "total_s": seconds.sum(),
+            "p50_ms": seconds.quantile(0.5) * 1000,
+            "p95_ms": seconds.quantile(0.95) * 1000,
+            "max_ms": seconds.max() * 1000,
+            "errors": (~spans["ok"].astype(bool)).groupby(spans["phase"], sort=False).sum(),
+        })
+
+    def report(self, label="screener"):
+        summary = self.summary()
+        if summary.empty:
+            return
+        print(f"[{label}] Phase Timings:")
+        print(summary.to_string(float_format=lambda v: f"{v:.1f}"))
+
+    def write_jsonl(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            spans = list(self.spans)
+
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            for entry in spans:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, path)
+        return len(spans)
@@ -0,0 +1,358 @@
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+import yfinance as yf
+
+OptionChain = namedtuple("OptionChain", ["calls", "puts"])
+
+HISTORY_PERIODS = {"5d": pd.DateOffset(days=5), "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3),
+                   "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2)}
+
+def history_as_of(df, period, as_of):
+    #The bars a period request made at the close of as_of would have returned: nothing after it, and only the
+    #trailing period before it ('1d' is the last bar)
+    if df.empty:
+        return df
+    index = pd.DatetimeIndex(df.index)
+    days = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    end = pd.Timestamp(as_of)
+    known = days <= end
+    df, days = df[known], days[known]
+    if period == "1d":
+        return df.iloc[-1:]
+    if period in HISTORY_PERIODS:
+        return df[days > end - HISTORY_PERIODS[period]]
+    return df
+
+class YahooSource:
+    def __init__(self):
+        self._tickers = {}
+        self._lock = threading.Lock()
+
+    def ticker(self, symbol):
+        #yfinance maps expiry strings to epochs through the listing it downloaded, so one Ticker is kept per symbol
+        with self._lock:
+            if symbol not in self._tickers:
+                self._tickers[symbol] = yf.Ticker(symbol)
+            return self._tickers[symbol]
+
+    def options(self, symbol):
+        return list(self.ticker(symbol).options)
+
+    def option_chain(self, symbol, exp_date):
+        chain = self.ticker(symbol).option_chain(exp_date)
+        return OptionChain(chain.calls, chain.puts)
+
+    def history(self, symbol, period):
+        return self.ticker(symbol).history(period=period)
+
+    def calendar_page(self, payload, fetch):
+        #Calendar pages come from investing.com, not Yahoo; fetch is the screener's live request, taken here so that
+        #recording and replay sources can sit in front of it
+        return fetch(payload)
+
+    def download(self, symbols, period):
+        frame = yf.download(symbols, period=period, interval='1d', group_by='ticker', auto_adjust=True, actions=False, threads=True, progress=False)
+
+        if not isinstance(frame.columns, pd.MultiIndex):
+            return {}
+
+        bars = {}
+        downloaded = set(frame.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol in downloaded:
+                df = frame[symbol].dropna(how='all')
+                if not df.empty:
+                    bars[symbol] = df
+        return bars
+
+class DataCache:
+    DEFAULT_TTLS = {"options": 12 * 3600, "chain": 30 * 60, "history": 30 * 60}
+
+    def __init__(self, path, ttls=None, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, kind TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL, value BLOB NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(kind, symbol, arg="", day=None):
+        day = day or datetime.today().date().strftime("%Y-%m-%d")
+        return f"{kind}|{symbol}|{arg}|{day}"
+
+    def get(self, kind, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT created, value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] > self.ttls[kind]:
+                if row is not None:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses[kind] += 1
+                return None
+
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits[kind] += 1
+        return pickle.loads(row[1])
+
+    def put(self, kind, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries (key, kind, created, accessed, size, value) VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, kind, now, now, len(blob), sqlite3.Binary(blob)))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return {
+            "entries": entries,
+            "bytes": size,
+            **{kind: {"hits": self.hits[kind], "misses": self.misses[kind]} for kind in kinds},
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class CachedSource:
+    def __init__(self, inner, cache):
+        self.inner = inner
+        self.cache = cache
+
+    def _cached(self, kind, key, fetch):
+        value = self.cache.get(kind, key)
+        if value is None:
+            value = fetch()
+            self.cache.put(kind, key, value)
+        return value
+
+    def options(self, symbol):
+        return self._cached("options", DataCache.make_key("options", symbol), lambda: self.inner.options(symbol))
+
+    def option_chain(self, symbol, exp_date):
+        return self._cached("chain", DataCache.make_key("chain", symbol, exp_date), lambda: self.inner.option_chain(symbol, exp_date))
+
+    def history(self, symbol, period):
+        return self._cached("history", DataCache.make_key("history", symbol, period), lambda: self.inner.history(symbol, period))
+
+    def calendar_page(self, payload, fetch):
+        return self.inner.calendar_page(payload, fetch)
+
+    def download(self, symbols, period):
+        bars = {}
+        missing = []
+        for symbol in symbols:
+            cached = self.cache.get("history", DataCache.make_key("history", symbol, period))
+            if cached is None:
+                missing.append(symbol)
+            else:
+                bars[symbol] = cached
+
+        if missing:
+            fetched = self.inner.download(missing, period)
+            for symbol, df in fetched.items():
+                self.cache.put("history", DataCache.make_key("history", symbol, period), df)
+            bars.update(fetched)
+
+        return {symbol: bars[symbol] for symbol in symbols if symbol in bars}
+
+class FixtureStore:
+    #One scan's market data on disk: calendar pages as JSON, options listings, chains and history frames as pickles
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, kind, *parts):
+        name = "_".join(str(p) for p in parts)
+        return self.directory / kind / f"{name}.{'json' if kind == 'calendar' else 'pkl'}"
+
+    def calendar_path(self, payload):
+        return self.path("calendar", payload['dateFrom'], payload['dateTo'], payload.get('limit_from', 0))
+
+    def save(self, path, value):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w" if path.suffix == ".json" else "wb") as f:
+            if path.suffix == ".json":
+                json.dump(value, f)
+            else:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        if path.suffix == ".json":
+            with open(path) as f:
+                return json.load(f)
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def write_manifest(self, manifest):
+        self.save(self.directory / "manifest.json", manifest)
+
+    def manifest(self):
+        return self.load(self.directory / "manifest.json")
+
+def prune_fixtures(root, max_bytes, keep=()):
+    #Deletes whole fixture directories under root, oldest scan date first, until the rest fit in max_bytes. Directories
+    #named in keep are never deleted.
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    sizes = {d: sum(f.stat().st_size for f in d.rglob("*") if f.is_file()) for d in root.iterdir() if d.is_dir()}
+    total = sum(sizes.values())
+    removed = []
+    for directory in sorted(sizes, key=lambda d: d.name):
+        if total <= max_bytes:
+            break
+        if directory.name in keep:
+            continue
+        shutil.rmtree(directory, ignore_errors=True)
+        total -= sizes[directory]
+        removed.append(directory.name)
+    return removed
+
+class RecordingSource:
+    #Passes every call through to inner and writes what came back into a FixtureStore for ReplaySource
+    def __init__(self, inner, directory):
+        self.inner = inner
+        self.store = FixtureStore(directory)
+
+    def options(self, symbol):
+        value = self.inner.options(symbol)
+        self.store.save(self.store.path("options", symbol), value)
+        return value
+
+    def option_chain(self, symbol, exp_date):
+        value = self.inner.option_chain(symbol, exp_date)
+        self.store.save(self.store.path("chain", symbol, exp_date), value)
+        return value
+
+    def history(self, symbol, period):
+        value = self.inner.history(symbol, period)
+        self.store.save(self.store.path("history", symbol, period), value)
+        return value
+
+    def download(self, symbols, period):
+        bars = self.inner.download(symbols, period)
+        for symbol, df in bars.items():
+            self.store.save(self.store.path("history", symbol, period), df)
+        return bars
+
+    def calendar_page(self, payload, fetch):
+        page = self.inner.calendar_page(payload, fetch)
+        self.store.save(self.store.calendar_path(payload), page)
+        return page
+
+class RecordingCalendar:
+    #Passes calendar lookups through to an EarningsCalendarStore and writes each day's earnings map into a
+    #FixtureStore, so a scan whose calendar came from disk can still be replayed with ReplayCalendar
+    def __init__(self, inner, directory):
+        self.inner = inner
+        self.store = FixtureStore(directory)
+
+    def get(self, day, fetch_range):
+        earnings = self.inner.get(day, fetch_range)
+        self.store.save(self.store.path("earnings", day), earnings)
+        return earnings
+
+class ReplayCalendar:
+    #Serves the days a RecordingCalendar wrote; a day that was not recorded has no earnings
+    def __init__(self, directory):
+        self.store = FixtureStore(directory)
+
+    @staticmethod
+    def recorded(directory):
+        return (Path(directory) / "earnings").is_dir()
+
+    def get(self, day, fetch_range):
+        path = self.store.path("earnings", day)
+        return self.store.load(path) if path.exists() else {}
+
+class ReplaySource:
+    #Serves a recorded scan back through the same calls. Anything that was not recorded looks like Yahoo's answer
+    #for an unknown symbol. latency (seconds) is slept before every call to stand in for the network. With as_of set,
+    #history is cut to what was known at that day's close; history_directory holds long <SYMBOL>.pkl daily bars
+    #used for symbols the scan itself did not record.
+    def __init__(self, directory, latency=0.0, as_of=None, history_directory=None):
+        self.store = FixtureStore(directory)
+        self.latency = latency
+        self.as_of = as_of
+        self.history_directory = Path(history_directory) if history_directory is not None else None
+
+    def _history(self, symbol, period):
+        path = self.store.path("history", symbol, period)
+        if not path.exists() and self.history_directory is not None:
+            path = self.history_directory / f"{symbol}.pkl"
+        if not path.exists():
+            return None
+
+        df = self.store.load(path)
+        if self.as_of is not None:
+            df = history_as_of(df, period, self.as_of)
+        return df
+
+    def _read(self, path, default):
+        if self.latency:
+            time.sleep(self.latency)
+        if not path.exists():
+            return default
+        return self.store.load(path)
+
+    def options(self, symbol):
+        return self._read(self.store.path("options", symbol), [])
+
+    def option_chain(self, symbol, exp_date):
+        chain = self._read(self.store.path("chain", symbol, exp_date), None)
+        if chain is None:
+            raise KeyError(f"No recorded option chain for {symbol} {exp_date}")
+        return chain
+
+    def history(self, symbol, period):
+        if self.latency:
+            time.sleep(self.latency)
+        df = self._history(symbol, period)
+        return df if df is not None else pd.DataFrame()
+
+    def download(self, symbols, period):
+        if self.latency:
+            time.sleep(self.latency)
+        bars = {}
+        for symbol in symbols:
+            df = self._history(symbol, period)
+            if df is not None and not df.empty:
+                bars[symbol] = df
+        return bars
+
+    def calendar_page(self, payload, fetch):
+        return self._read(self.store.calendar_path(payload), {"data": "", "bind_scroll_handler": False})
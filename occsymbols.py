@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+#OCC option symbols as Alpaca writes them: root (1-6 characters, unpadded), expiry YYMMDD, C or P, then the strike in
+#thousandths as 8 digits, e.g. AAPL261016C00310000. Symbols are right-justified to a fixed width and viewed as a byte
+#matrix, so every field sits in the same columns and a whole array is decoded with a few NumPy operations.
+
+ROOT_WIDTH = 6
+TAIL_WIDTH = 15
+WIDTH = ROOT_WIDTH + TAIL_WIDTH
+
+_DIGIT_POWERS = 10 ** np.arange(7, -1, -1, dtype=np.int64)
+
+def _digits(block):
+    return (block.astype(np.int64) - ord("0")) @ _DIGIT_POWERS[-block.shape[1]:]
+
+def parse_occ(symbols, errors="raise"):
+    #Returns one row per symbol with root, expiry (datetime64[D]), type ('C'/'P') and strike. A symbol that is not a
+    #well-formed OCC symbol raises ValueError, or with errors="coerce" gets None/NaT/NaN fields instead.
+    symbols = np.asarray(list(symbols), dtype=object)
+    if len(symbols) == 0:
+        return pd.DataFrame({"symbol": pd.Series(dtype=object), "root": pd.Series(dtype=object),
+                             "expiry": pd.Series(dtype="datetime64[ns]"), "type": pd.Series(dtype=object),
+                             "strike": pd.Series(dtype=np.float64)})
+
+    text = symbols.astype(str)
+    lengths = np.char.str_len(text)
+    raw = np.char.encode(np.char.rjust(text, WIDTH), "ascii", "replace").astype(f"S{WIDTH}")
+    block = raw.view(np.uint8).reshape(len(text), WIDTH)
+
+    tail = block[:, ROOT_WIDTH:]
+    digits = np.concatenate([tail[:, :6], tail[:, 7:]], axis=1)
+    cp = tail[:, 6]
+    valid = ((lengths > TAIL_WIDTH) & (lengths <= WIDTH) & ((digits >= ord("0")) & (digits <= ord("9"))).all(axis=1)
+             & ((cp == ord("C")) | (cp == ord("P"))))
+    if not valid.all() and errors != "coerce":
+        raise ValueError(f"Not an OCC option symbol: {str(text[np.argmin(valid)])!r}")
+    block[~valid, ROOT_WIDTH:] = ord("0")
+    block[~valid, ROOT_WIDTH + 6] = ord("C")
+
+    date = np.maximum(_digits(tail[:, :6]), 101)
+    years = 2000 + date // 10000
+    months = date // 100 % 100
+    days = date % 100
+    expiry = (years - 1970).astype("datetime64[Y]") + (months - 1).astype("timedelta64[M]")
+    expiry = expiry.astype("datetime64[D]") + (days - 1).astype("timedelta64[D]")
+
+    parsed = pd.DataFrame({
+        "symbol": symbols,
+        "root": np.char.strip(np.char.decode(np.ascontiguousarray(block[:, :ROOT_WIDTH]).view(f"S{ROOT_WIDTH}")[:, 0])).astype(object),
+        "expiry": expiry,
+        "type": np.where(cp == ord("C"), "C", "P").astype(object),
+        "strike": _digits(tail[:, 7:]) / 1000,
+    })
+    if not valid.all():
+        parsed.loc[~valid, ["root", "expiry", "type", "strike"]] = None
+    return parsed
+
+class StrikeIndex:
+    #Strikes listed at both of two expiries, sorted, with the symbol for each leg. nearest() is a binary search; a spot
+    #exactly between two strikes takes the lower one.
+    def __init__(self, front_symbols, back_symbols):
+        front = parse_occ(front_symbols).drop_duplicates("strike", keep="last")
+        back = parse_occ(back_symbols).drop_duplicates("strike", keep="last")
+        self.strikes, fi, bi = np.intersect1d(front["strike"].to_numpy(), back["strike"].to_numpy(), return_indices=True)
+        self.front_symbols = front["symbol"].to_numpy()[fi]
+        self.back_symbols = back["symbol"].to_numpy()[bi]
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def nearest(self, spot):
+        if len(self.strikes) == 0:
+            return None
+        i = int(np.searchsorted(self.strikes, spot))
+        if i == len(self.strikes) or (i > 0 and spot - self.strikes[i - 1] <= self.strikes[i] - spot):
+            i -= 1
+        return float(self.strikes[i]), self.front_symbols[i], self.back_symbols[i]
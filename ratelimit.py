@@ -0,0 +1,42 @@
+import threading
+import time
+
+class TokenBucket:
+    #Thread-safe token bucket: tokens refill continuously at rate per second up to capacity, and acquire() blocks only
+    #for as long as the bucket is actually empty. capacity bounds the burst, so any window of t seconds spends at most
+    #capacity + rate * t requests.
+    def __init__(self, rate, capacity=1):
+        if rate <= 0 or capacity < 1:
+            raise ValueError(f"TokenBucket needs a positive rate and a capacity of at least 1, got {rate} and {capacity}")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests, burst=1):
+        return cls(requests / 60.0, capacity=burst)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        #Reserves the tokens up front, so concurrent callers queue behind each other instead of racing for the refill
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def drain(self):
+        #Empties the bucket after the server reports the budget is used up (HTTP 429), so every caller waits for refill
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
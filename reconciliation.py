@@ -1,7 +1,7 @@
-import time, requests
+import time
 from typing import List, Dict
 import pandas as pd
-import paperconfig
+from alpacaclient import QUOTE_MAX_AGE, QuoteBatch, shared_client
 
 class CalendarOpenReconciler:
     PAPER_DOMAIN = "https://paper-api.alpaca.markets"
@@ -14,12 +14,10 @@ class CalendarOpenReconciler:
         "Limit Price",
     ]
 
-    def __init__(self, input_df):
+    def __init__(self, input_df, client=None):
         self.df = input_df
-        self.rate_delay = 0.25
-        self.max_retries = 8
-        self.max_wait = 60
-        self.hdr = paperconfig.header
+        self.client = client if client is not None else shared_client()
+        self.quotes = QuoteBatch(self.client)
         self.cleanedRows: List[Dict] = []
 
     def extract_fills(self, orderJSON, frontSymbol, backSymbol):
@@ -37,19 +35,20 @@ class CalendarOpenReconciler:
         return frontQuantity, backQuantity, frontPrice, backPrice
     
     def get_quote_data(self, symbol, field):
-        url = f"https://data.alpaca.markets/v1beta1/options/quotes/latest?symbols={symbol}&feed=indicative"
-        js = self.request("GET", url)
-        if js:
-            return js["quotes"][symbol][field]
-        return None
+        #Quotes are only needed for partial fills; the first one fetches every row's legs in one batch, and a later
+        #partial fill refetches quotes that have aged past QUOTE_MAX_AGE during the cancel waits
+        return self.quotes.get(symbol, field)
 
     def run(self):
+        if self.df.empty or not {"Front Symbol", "Back Symbol"}.issubset(self.df.columns):
+            print("No Placed Orders To Reconcile")
+            return pd.DataFrame(columns=self.OUTPUT_COLS)
+
+        self.quotes = QuoteBatch(self.client, [*self.df["Front Symbol"], *self.df["Back Symbol"]], max_age=QUOTE_MAX_AGE)
         for _, row in self.df.iterrows():
             updated = self.process_row(row)
             if updated is not None:
                 self.cleanedRows.append(updated)
-            
-            time.sleep(self.rate_delay)
 
         toReturn = pd.DataFrame(self.cleanedRows, columns=self.OUTPUT_COLS)
 
@@ -134,33 +133,7 @@ class CalendarOpenReconciler:
         self.request("DELETE", url)
 
     def request(self, method, url, **kw):
-        for attempt in range(self.max_retries):
-            try:
-                r = requests.request(method, url, headers=self.hdr, timeout=10, **kw)
-
-                if r.status_code == 404:
-                    return None
-
-                if r.status_code == 429:
-                    wait = min(self.max_wait, self.rate_delay * (2 ** attempt))
-                    print(f"[429 Error] waiting {wait} seconds - {url}")
-                    time.sleep(wait)
-                    continue
-
-                r.raise_for_status()
-
-                if not r.content or r.status_code == 204:
-                    return {} if method == "DELETE" else None
-
-                return r.json()
-
-            except requests.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    print(f"[ERROR] {url} - {e}")
-                    return None
-                time.sleep(self.rate_delay * (2 ** attempt))
-
-        return None
+        return self.client.request(method, url, **kw)
 
 # def main():
 #     df = pd.read_csv("PlacedOrders.csv")
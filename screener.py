@@ -1,119 +1,415 @@
 import json
 from typing import List
-from bs4 import BeautifulSoup
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+import threading
+import time
 import requests
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
+from pathlib import Path
 import numpy as np
-from scipy.interpolate import interp1d
+from universeindex import load_universe
+from volengine import average_volume_batch, realized_metrics, yang_zhang_batch
+from marketdata import YahooSource
+from earningscalendar import EarningsCalendarStore, parse_earnings_html, parse_earnings_pages
+from chainkernel import atm_term_structure
+from termstructure import TermStructure, bracket
+from instrumentation import SpanRecorder
+from checkpoint import ScanCheckpoint
 import warnings
 warnings.filterwarnings("ignore")
 
 class Screener:
-    def __init__(self, date_str, volume, iv30_rv30, tss):
+    #Threshold checks ordered by the cost of the data they need: daily bars, then option chains, then the Yang-Zhang pass
+    STAGES = ("avg_volume", "ts_slope_0_45", "iv30_rv30")
+    STAGE_COLUMNS = {"avg_volume": "Avg Volume", "ts_slope_0_45": "TS Slope", "iv30_rv30": "IV30/RV30"}
+    OUTPUT_COLUMNS = ["Ticker", "Avg Volume", "IV30/RV30", "TS Slope", "Expected Move", "Earnings Time"]
+    #Every evaluated ticker, passing or not. Rejected At names the first stage it failed (empty when it passed or errored)
+    #and Error holds the message of tickers that could not be scored. Early rejection at Avg Volume leaves the option
+    #metrics blank; every other evaluated ticker has all of them.
+    METRICS_COLUMNS = OUTPUT_COLUMNS + ["Rejected At", "Error"]
+
+    CALENDAR_URL = "https://www.investing.com/earnings-calendar/Service/getCalendarFilteredData"
+    CALENDAR_HEADERS = {
+        'User-Agent': 'Mozilla/5.0',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'Referer': 'https://www.investing.com/earnings-calendar/'
+    }
+    CALENDAR_PAGE_WORKERS = 4
+    MAX_CALENDAR_PAGES = 20
+    CALENDAR_RETRIES = 4
+    CALENDAR_BACKOFF = 1.0 #Seconds before the first retry of a calendar page, doubled on each further retry
+
+    def __init__(self, date_str, volume, iv30_rv30, tss, max_workers=1, chain_workers=1, early_reject=True, history_batch_size=50, source=None, calendar=None, spans=None, as_of=None, checkpoint_dir=None, scan=True):
         self.avg_volume_threshold = volume
         self.iv30_rv30_threshold = iv30_rv30
         self.ts_slope_threshold = tss
-        self.inputDF = pd.read_csv('NasdaqAndNYSETradedStocks.csv')
-        self.outputDF = pd.DataFrame(columns=["Ticker", "Avg Volume", "IV30/RV30", "TS Slope", "Expected Move"])
-        self.scan_earnings_callback(date_str)
+        self.max_workers = max(1, int(max_workers))
+        self.chain_workers = max(1, int(chain_workers))
+        self.early_reject = early_reject
+        self.history_batch_size = history_batch_size
+        self.source = source if source is not None else YahooSource()
+        self.calendar = calendar
+        self.spans = spans if spans is not None else SpanRecorder()
+        self.checkpoint_dir = checkpoint_dir
+        self.as_of = datetime.strptime(as_of, "%Y-%m-%d").date() if isinstance(as_of, str) else as_of
+        self.price_history = {}
+        self.realized = realized_metrics({})
+        self.stage_counts = Counter()
+        self._counts_lock = threading.Lock()
+        self.universe = load_universe()
+        self.outputDF = pd.DataFrame(columns=self.OUTPUT_COLUMNS)
+        self.metrics = {}
+        self.metricsDF = pd.DataFrame(columns=self.METRICS_COLUMNS)
+        if scan:
+            self.scan_earnings_callback(date_str)
 
     def tradedOnNYSEOrNasdaq(self, stock):
-        return stock in self.inputDF['Ticker'].values
+        return stock in self.universe
 
     def passesThresholds(self, stockInformation):
         return (stockInformation['avg_volume'] >= self.avg_volume_threshold) and (stockInformation['iv30_rv30'] >= self.iv30_rv30_threshold) and (stockInformation['ts_slope_0_45'] <= self.ts_slope_threshold)
 
+    @staticmethod
+    def refilter(metrics, volume, iv30_rv30, tss):
+        #passesThresholds over a whole metrics table, without touching the network. Blank metrics compare False, so
+        #errored tickers and tickers rejected early at Avg Volume never pass.
+        passed = (metrics["Avg Volume"] >= volume) & (metrics["IV30/RV30"] >= iv30_rv30) & (metrics["TS Slope"] <= tss)
+        return metrics.loc[passed, Screener.OUTPUT_COLUMNS].reset_index(drop=True)
+
+    def apply_thresholds(self, metrics):
+        return self.refilter(metrics, self.avg_volume_threshold, self.iv30_rv30_threshold, self.ts_slope_threshold)
+
+    @staticmethod
+    def load_metrics(path):
+        #"NA" is a listed ticker, so only empty cells read as missing
+        return pd.read_csv(path, dtype={"Ticker": str}, keep_default_na=False, na_values=[""], float_precision="round_trip")
+
+    def stageFails(self, stage, value):
+        if stage == "avg_volume":
+            return not value >= self.avg_volume_threshold
+        if stage == "iv30_rv30":
+            return not value >= self.iv30_rv30_threshold
+        return not value <= self.ts_slope_threshold
+
+    def count_outcome(self, outcome):
+        with self._counts_lock:
+            self.stage_counts[outcome] += 1
+
+    def report_stage_counts(self):
+        c = self.stage_counts
+        print(f"[screener] {sum(c.values())} Tickers Evaluated: {c['passed']} Passed, {c['error']} Errors, "
+              f"Rejected At Avg Volume {c['avg_volume']} (No Option Requests), TS Slope {c['ts_slope_0_45']}, IV30/RV30 {c['iv30_rv30']}")
+
     def scan_earnings_callback(self, date_str: str):
+        for _ in self.stream_earnings(date_str):
+            pass
+
+    def stream_earnings(self, date_str: str):
+        self.spans.clear()
+        with self.spans.span("calendar", date_str):
+            universe = self.build_universe(date_str)
+
+        checkpoint = ScanCheckpoint(Path(self.checkpoint_dir) / f"{date_str}.jsonl") if self.checkpoint_dir is not None else None
+        done = checkpoint.load() if checkpoint is not None else {}
+        #A checkpointed row is judged again under the current thresholds. Errored tickers (often the same transient
+        #failure that stopped the run) and rows an early rejection cut short before any recorded metric fails them are
+        #evaluated again
+        done = {tk: row for tk, row in done.items() if row["Error"] is None and self.restored_rejection(row)[0]}
+        remaining = [tk for tk in universe if tk not in done]
+
+        with self.spans.span("prefetch_history"):
+            self.prefetch_history(remaining)
+
+        self.stage_counts.clear()
+        self.metrics = {}
+        passed = {}
+        if done:
+            print(f"[screener] Resuming {date_str}: {len(universe) - len(remaining)} Tickers Restored From Checkpoint, {len(remaining)} Remaining")
+        for tk in universe:
+            if tk in done:
+                row = self.restore_metrics(done[tk])
+                if row is not None:
+                    passed[tk] = row
+                    yield row
+
+        try:
+            for tk, row in self.iter_evaluations(remaining):
+                if checkpoint is not None and tk in self.metrics:
+                    checkpoint.append(self.metrics[tk])
+                if row is not None:
+                    passed[tk] = row
+                    yield row
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+        self.report_stage_counts()
+        self.spans.report()
+
+        #Rows stream out as tickers finish, but outputDF keeps the universe order so every run lays it out the same way
+        self.outputDF = pd.DataFrame([passed[tk] for tk in universe if tk in passed], columns=self.OUTPUT_COLUMNS)
+        self.metricsDF = pd.DataFrame([self.metrics[tk] for tk in universe if tk in self.metrics], columns=self.METRICS_COLUMNS)
+
+    @classmethod
+    def scan_range(cls, start_date, end_date, volume, iv30_rv30, tss, weekdays_only=True, **kwargs):
+        #Scans every date from start_date to end_date inclusive with one screener and returns {date: outputDF}
+        app = cls(start_date, volume, iv30_rv30, tss, scan=False, **kwargs)
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return app.scan_dates([d.strftime("%Y-%m-%d") for d in dates if not weekdays_only or d.weekday() < 5])
+
+    def scan_dates(self, dates):
+        #A ticker's metrics don't depend on the scan date, only its Earnings Time does. So the calendar comes from one
+        #range request, history is prefetched once for the union of the dates' universes, each ticker is evaluated
+        #once, and every date's frame is cut from the shared metrics with its own timings.
+        if not dates:
+            return {}
+        if self.calendar is None:
+            first = datetime.strptime(min(dates), "%Y-%m-%d").date()
+            last = datetime.strptime(max(dates), "%Y-%m-%d").date()
+            self.calendar = EarningsCalendarStore(None, days_ahead=(last - first).days + 2)
+
+        self.spans.clear()
+        universes = {}
+        earnings_times = {}
+        for date_str in dates:
+            with self.spans.span("calendar", date_str):
+                universes[date_str] = self.build_universe(date_str)
+            earnings_times[date_str] = self._earnings_time
+        tickers = list(dict.fromkeys(tk for date_str in dates for tk in universes[date_str]))
+
+        with self.spans.span("prefetch_history"):
+            self.prefetch_history(tickers)
+
+        self.stage_counts.clear()
+        self.metrics = {}
+        self._earnings_time = {}
+        for _ in self.iter_evaluations(tickers):
+            pass
+        self.report_stage_counts()
+        self.spans.report()
+
+        self.metricsDF = pd.DataFrame([self.metrics[tk] for tk in tickers if tk in self.metrics], columns=self.METRICS_COLUMNS)
+        results = {}
+        for date_str in dates:
+            rows = [{**self.metrics[tk], "Earnings Time": earnings_times[date_str].get(tk, "Unknown")} for tk in universes[date_str] if tk in self.metrics]
+            results[date_str] = self.apply_thresholds(pd.DataFrame(rows, columns=self.METRICS_COLUMNS))
+        return results
+
+    def build_universe(self, date_str):
         day0 = datetime.strptime(date_str, "%Y-%m-%d").date()
         day1 = day0 + timedelta(days=1)
 
-        day0_map = self.fetch_earnings_data(day0.strftime("%Y-%m-%d"))
-        day1_map = self.fetch_earnings_data(day1.strftime("%Y-%m-%d"))
+        if self.calendar is not None:
+            day0_map = self.calendar.get(day0.strftime("%Y-%m-%d"), self.fetch_earnings_range)
+            day1_map = self.calendar.get(day1.strftime("%Y-%m-%d"), self.fetch_earnings_range)
+        else:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="calendar") as pool:
+                day0_map, day1_map = pool.map(self.fetch_earnings_data, [day0.strftime("%Y-%m-%d"), day1.strftime("%Y-%m-%d")])
 
         post_mkt = [t for t, tm in day0_map.items() if tm == "Post Market"]
         pre_mkt  = [t for t, tm in day1_map.items() if tm == "Pre Market"]
 
-        overnight_tickers = list({*post_mkt, *pre_mkt})
+        overnight_tickers = list(dict.fromkeys([*post_mkt, *pre_mkt]))
 
         self._earnings_time = {**{t: "Post Market" for t in post_mkt}, **{t: "Pre Market"  for t in pre_mkt}}
 
-        universe = [t for t in overnight_tickers if self.tradedOnNYSEOrNasdaq(t)]
+        return [t for t in overnight_tickers if self.tradedOnNYSEOrNasdaq(t)]
 
-        results = []
-        for tk in universe:
-            data = self.compute_recommendation(tk)
-            if isinstance(data, dict):
-                data['ticker'] = tk
-                if self.passesThresholds(data):
-                    results.append({
-                        "Ticker": tk,
-                        "Avg Volume": data['avg_volume'],
-                        "IV30/RV30": data['iv30_rv30'],
-                        "TS Slope": data['ts_slope_0_45'],
-                        "Expected Move": data['expected_move'],
-                        "Earnings Time": self._earnings_time.get(tk, "Unknown")
-                    })
-
-        self.outputDF = pd.DataFrame(results, columns=["Ticker", "Avg Volume", "IV30/RV30","TS Slope", "Expected Move", "Earnings Time"])
-
-    def fetch_earnings_data(self, date: str) -> dict[str, str]:
-        url = "https://www.investing.com/earnings-calendar/Service/getCalendarFilteredData"
-        headers = {
-            'User-Agent': 'Mozilla/5.0',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Content-Type': 'application/x-www-form-urlencoded',
-            'Referer': 'https://www.investing.com/earnings-calendar/'
-        }
-        payload = {
-            'country[]': '5', # United States
-            'dateFrom': date,
-            'dateTo': date,
-            'currentTab': 'custom',
-            'limit_from': 0
-        }
+    def prefetch_history(self, universe):
+        self.price_history = {}
+        if not self.history_batch_size:
+            self.realized = realized_metrics({})
+            return
 
+        for i in range(0, len(universe), self.history_batch_size):
+            batch = universe[i:i + self.history_batch_size]
+            try:
+                with self.spans.span("history_batch", f"{i}:{i + len(batch)}"):
+                    self.price_history.update(self.source.download(batch, '3mo'))
+            except Exception as e:
+                print(f"[prefetch_history] Batch download error: {e}")
+
+        with self.spans.span("realized_metrics"):
+            self.realized = realized_metrics(self.price_history)
+
+    def lookup_realized(self, ticker, column):
+        if ticker in self.realized.index:
+            return self.realized.at[ticker, column]
+        return None
+
+    def iter_evaluations(self, universe):
+        if self.max_workers == 1 or len(universe) <= 1:
+            for tk in universe:
+                yield tk, self.evaluate_ticker(tk)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(universe)), thread_name_prefix="screener") as pool:
+            futures = {pool.submit(self.evaluate_ticker, tk): tk for tk in universe}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def evaluate_ticker(self, tk):
         try:
-            resp = requests.post(url, headers=headers, data=payload, timeout=15)
-            resp.raise_for_status()
-
-            data = resp.json()
-            soup = BeautifulSoup(data['data'], 'html.parser')
-            rows = soup.find_all('tr')
-
-            earnings = {}
-
-            for row in rows:
-                if not row.find('span', class_='earnCalCompanyName'):
-                    continue
+            with self.spans.span("ticker", tk):
+                data = self.compute_recommendation(tk)
+            if not isinstance(data, dict):
+                self.count_outcome("error")
+                self.record_metrics(tk, {}, error=str(data))
+                return None
+
+            data['ticker'] = tk
+            if 'rejected_at' in data:
+                rejected_at = data['rejected_at']
+            elif not self.passesThresholds(data):
+                rejected_at = next(st for st in self.STAGES if self.stageFails(st, data[st]))
+            else:
+                rejected_at = None
+
+            row = self.record_metrics(tk, data, rejected_at=rejected_at)
+            self.count_outcome(rejected_at or "passed")
+            if rejected_at is None:
+                return {col: row[col] for col in self.OUTPUT_COLUMNS}
+        except Exception as e:
+            self.count_outcome("error")
+            self.record_metrics(tk, {}, error=str(e))
+            print(f"[{tk}] -- {e}")
+        return None
+
+    def restored_rejection(self, metrics):
+        #(True, first stage a checkpointed row fails under the current thresholds or None when it passes). (False, None)
+        #when a stage's metric is blank before any recorded one fails, since the row can't be judged without it.
+        for stage in self.STAGES:
+            value = metrics[self.STAGE_COLUMNS[stage]]
+            if value is None or pd.isna(value):
+                return False, None
+            if self.stageFails(stage, value):
+                return True, stage
+        return True, None
+
+    def restore_metrics(self, metrics):
+        #A checkpointed ticker keeps its metrics, but passes or fails on the current thresholds
+        tk = metrics["Ticker"]
+        rejected_at = self.restored_rejection(metrics)[1]
+        self.metrics[tk] = {**metrics, "Rejected At": rejected_at}
+        self.count_outcome(rejected_at or "passed")
+        if rejected_at is None:
+            return {col: metrics[col] for col in self.OUTPUT_COLUMNS}
+        return None
+
+    def record_metrics(self, tk, data, rejected_at=None, error=None):
+        row = {
+            "Ticker": tk,
+            "Avg Volume": data.get('avg_volume'),
+            "IV30/RV30": data.get('iv30_rv30'),
+            "TS Slope": data.get('ts_slope_0_45'),
+            "Expected Move": data.get('expected_move'),
+            "Earnings Time": self._earnings_time.get(tk, "Unknown"),
+            "Rejected At": rejected_at,
+            "Error": error,
+        }
+        self.metrics[tk] = row
+        return row
 
-                try:
-                    ticker = row.find('a', class_='bold').text.strip().upper()
+    def fetch_earnings_data(self, date: str) -> dict[str, str]:
+        pages = self.fetch_calendar_html(date, date)
+        if pages is None:
+            return {}
 
-                    tt_span = row.find('span', class_='genToolTip')
-                    tooltip = tt_span.get('data-tooltip', '').strip() if tt_span else ''
+        earnings = {}
+        with self.spans.span("calendar_parse", date):
+            for html in pages:
+                earnings.update(self.parse_earnings_html(html))
+        return earnings
 
-                    if tooltip == 'Before market open':
-                        etime = 'Pre Market'
-                    elif tooltip == 'After market close':
-                        etime = 'Post Market'
-                    else:
-                        etime = 'During Market'
+    def fetch_earnings_range(self, date_from, date_to):
+        pages = self.fetch_calendar_html(date_from, date_to)
+        if pages is None:
+            return None
 
-                    earnings[ticker] = etime
-                except Exception as e:
-                    print(f"[fetch_earnings_data] Row parse error: {e}")
-                    continue
+        with self.spans.span("calendar_parse", f"{date_from}:{date_to}"):
+            return parse_earnings_pages(pages, default_day=date_from)
 
-            return earnings
+    def fetch_calendar_html(self, date_from, date_to):
+        #Every page's HTML in order, or None when the response is incomplete (a page failed on every retry, or the
+        #page cap was reached with rows still to come), so callers never see a truncated universe as a whole one
+        payload = {
+            'country[]': '5', # United States
+            'dateFrom': date_from,
+            'dateTo': date_to,
+            'currentTab': 'custom',
+            'limit_from': 0
+        }
 
-        except (requests.RequestException, json.JSONDecodeError) as e:
-            print(f"[fetch_earnings_data] HTTP / JSON error: {e}")
-            return {}
+        first = self.fetch_calendar_page(payload, 0)
+        if first is None:
+            return None
+
+        pages = [first]
+        if first.get('bind_scroll_handler'):
+            if first.get('last_time_scope'):
+                payload['last_time_scope'] = first['last_time_scope']
+            later = self.fetch_calendar_pages(payload)
+            if later is None:
+                print(f"[fetch_earnings_data] Incomplete calendar for {date_from}:{date_to}, discarding it")
+                return None
+            pages.extend(later)
+
+        return [page['data'] for page in pages]
+
+    def post_calendar(self, payload):
+        with self.spans.span("calendar_page", f"{payload['dateFrom']}:{payload['dateTo']}#{payload['limit_from']}"):
+            return self.source.calendar_page(payload, self.request_calendar)
+
+    def request_calendar(self, payload):
+        resp = requests.post(self.CALENDAR_URL, headers=self.CALENDAR_HEADERS, data=payload, timeout=15)
+        resp.raise_for_status()
+        return resp.json()
+
+    def fetch_calendar_page(self, payload, page):
+        #Retries a failed page with exponential backoff; None once every attempt has failed
+        for attempt in range(self.CALENDAR_RETRIES):
+            try:
+                return self.post_calendar({**payload, 'limit_from': page})
+            except (requests.RequestException, json.JSONDecodeError) as e:
+                print(f"[fetch_earnings_data] Page {page} error (attempt {attempt + 1}/{self.CALENDAR_RETRIES}): {e}")
+                if attempt < self.CALENDAR_RETRIES - 1:
+                    time.sleep(self.CALENDAR_BACKOFF * 2 ** attempt)
+        return None
+
+    def fetch_calendar_pages(self, payload):
+        #Later pages are requested a window at a time in parallel, stopping at the first page that reports no more rows.
+        #None when a page fails for good or MAX_CALENDAR_PAGES runs out before the last page.
+        pages = []
+        page = 1
+        with ThreadPoolExecutor(max_workers=self.CALENDAR_PAGE_WORKERS, thread_name_prefix="calendar-pages") as pool:
+            while page <= self.MAX_CALENDAR_PAGES:
+                window = range(page, min(page + self.CALENDAR_PAGE_WORKERS, self.MAX_CALENDAR_PAGES + 1))
+                for result in pool.map(partial(self.fetch_calendar_page, payload), window):
+                    if result is None:
+                        return None
+                    if not result.get('data'):
+                        return pages
+                    pages.append(result)
+                    if not result.get('bind_scroll_handler'):
+                        return pages
+                page += len(window)
+        print(f"[fetch_earnings_data] More than {self.MAX_CALENDAR_PAGES} calendar pages")
+        return None
+
+    def parse_earnings_html(self, html):
+        return parse_earnings_html(html)
     
+    def today(self):
+        #Expiries are dated against as_of when one is set, so a replayed scan picks the expiries it did when recorded
+        return self.as_of or datetime.today().date()
+
     def filter_dates(self, dates):
-        today = datetime.today().date()
+        today = self.today()
         cutoff_date = today + timedelta(days=45)
         
         sorted_dates = sorted(datetime.strptime(date, "%Y-%m-%d").date() for date in dates)
@@ -132,65 +428,64 @@ class Screener:
         raise ValueError("No date 45 days or more in the future found.")
 
     def yang_zhang(self, price_data, window=30, trading_periods=252, return_last_only=True):
-        log_ho = (price_data['High'] / price_data['Open']).apply(np.log)
-        log_lo = (price_data['Low'] / price_data['Open']).apply(np.log)
-        log_co = (price_data['Close'] / price_data['Open']).apply(np.log)
-        
-        log_oc = (price_data['Open'] / price_data['Close'].shift(1)).apply(np.log)
-        log_oc_sq = log_oc**2
-        
-        log_cc = (price_data['Close'] / price_data['Close'].shift(1)).apply(np.log)
-        log_cc_sq = log_cc**2
-        
-        rs = log_ho * (log_ho - log_co) + log_lo * (log_lo - log_co)
-        
-        close_vol = log_cc_sq.rolling(
-            window=window,
-            center=False
-        ).sum() * (1.0 / (window - 1.0))
-
-        open_vol = log_oc_sq.rolling(
-            window=window,
-            center=False
-        ).sum() * (1.0 / (window - 1.0))
-
-        window_rs = rs.rolling(
-            window=window,
-            center=False
-        ).sum() * (1.0 / (window - 1.0))
-
-        k = 0.34 / (1.34 + ((window + 1) / (window - 1)) )
-        result = (open_vol + k * close_vol + (1 - k) * window_rs).apply(np.sqrt) * np.sqrt(trading_periods)
+        ohlc = [price_data[col].to_numpy(dtype=float) for col in ("Open", "High", "Low", "Close")]
+        result = yang_zhang_batch(*ohlc, window=window, trading_periods=trading_periods, return_last_only=False)[0]
 
         if return_last_only:
-            return result.iloc[-1]
+            return result[-1]
         else:
-            return result.dropna()
-        
+            return pd.Series(result, index=price_data.index).dropna()
+
+    def average_volume(self, price_data, window=30):
+        avg_volume = average_volume_batch(price_data['Volume'].to_numpy(dtype=float), window)[0]
+        if np.isnan(avg_volume):
+            raise IndexError(f"Fewer than {window} days of volume history")
+        return avg_volume
 
     def build_term_structure(self, days, ivs):
-        days = np.array(days)
-        ivs = np.array(ivs)
+        return TermStructure(days, ivs)
+
+    def select_expiries(self, exp_dates, today, skip=()):
+        candidates = [d for d in exp_dates if d not in skip]
+        if len(candidates) <= 1:
+            return candidates
+
+        dtes = [(datetime.strptime(d, "%Y-%m-%d").date() - today).days for d in candidates]
+
+        #The front expiry prices the straddle. Every term_spline lookup (front, 30 and 45 DTE) only reads
+        #the two knots the linear interpolation picks for it, so those are the only other chains we need.
+        lo, hi = bracket(dtes, [dtes[0], 30, 45])
+        needed = set(lo.tolist()) | set(hi.tolist())
 
-        sort_idx = days.argsort()
-        days = days[sort_idx]
-        ivs = ivs[sort_idx]
+        return [candidates[i] for i in sorted(needed)]
 
+    def fetch_needed_chains(self, ticker, exp_dates, today):
+        chains = {}
+        empty = set()
+        while True:
+            wanted = self.select_expiries(exp_dates, today, skip=empty)
+            missing = [d for d in wanted if d not in chains]
+            if not missing:
+                return {d: chains[d] for d in wanted}
 
-        spline = interp1d(days, ivs, kind='linear', fill_value="extrapolate")
+            chains.update(self.fetch_option_chains(ticker, missing))
+            #Empty chains are skipped when building the term structure, so a neighbouring expiry takes their place
+            empty.update(d for d in missing if chains[d].calls.empty or chains[d].puts.empty)
 
-        def term_spline(dte):
-            if dte < days[0]:  
-                return ivs[0]
-            elif dte > days[-1]:
-                return ivs[-1]
-            else:  
-                return float(spline(dte))
+    def fetch_option_chains(self, ticker, exp_dates):
+        if self.chain_workers == 1 or len(exp_dates) <= 1:
+            return {exp_date: self.fetch_option_chain(ticker, exp_date) for exp_date in exp_dates}
 
-        return term_spline
+        with ThreadPoolExecutor(max_workers=min(self.chain_workers, len(exp_dates)), thread_name_prefix="chains") as pool:
+            chains = list(pool.map(partial(self.fetch_option_chain, ticker), exp_dates))
+        return dict(zip(exp_dates, chains))
+
+    def fetch_option_chain(self, ticker, exp_date):
+        with self.spans.span("option_chain", f"{ticker}:{exp_date}"):
+            return self.source.option_chain(ticker, exp_date)
 
     def get_current_price(self, ticker):
-        todays_data = ticker.history(period='1d')
+        todays_data = self.source.history(ticker, '1d')
         return todays_data['Close'].iloc[0]
 
     
@@ -200,96 +495,76 @@ class Screener:
             if not ticker:
                 return "No stock symbol provided."
             
+            price_history = self.price_history.get(ticker)
+            if price_history is None:
+                with self.spans.span("history", ticker):
+                    price_history = self.source.history(ticker, '3mo')
+
+            avg_volume = self.lookup_realized(ticker, 'avg_volume')
+            if avg_volume is None or np.isnan(avg_volume):
+                with self.spans.span("avg_volume", ticker):
+                    avg_volume = self.average_volume(price_history)
+            if self.early_reject and self.stageFails("avg_volume", avg_volume):
+                return {'avg_volume': avg_volume, 'rejected_at': 'avg_volume'}
+
             try:
-                stock = yf.Ticker(ticker)
-                if len(stock.options) == 0:
+                with self.spans.span("options", ticker):
+                    exp_dates = self.source.options(ticker)
+                if len(exp_dates) == 0:
                     raise KeyError()
             except KeyError:
                 return f"Error: No options found for stock symbol '{ticker}'."
             
-            exp_dates = list(stock.options)
             try:
                 exp_dates = self.filter_dates(exp_dates)
             except:
                 return "Error: Not enough option data."
             
-            options_chains = {}
-            for exp_date in exp_dates:
-                options_chains[exp_date] = stock.option_chain(exp_date)
+            today = self.today()
+            with self.spans.span("chains", ticker):
+                options_chains = self.fetch_needed_chains(ticker, exp_dates, today)
             
             try:
-                underlying_price = self.get_current_price(stock)
+                if ticker in self.price_history:
+                    underlying_price = price_history['Close'].iloc[-1]
+                else:
+                    with self.spans.span("price", ticker):
+                        underlying_price = self.get_current_price(ticker)
                 if underlying_price is None:
                     raise ValueError("No market price found.")
             except Exception:
                 return "Error: Unable to retrieve underlying stock price."
             
-            atm_iv = {}
-            straddle = None 
-            i = 0
-            for exp_date, chain in options_chains.items():
-                calls = chain.calls
-                puts = chain.puts
-
-                if calls.empty or puts.empty:
-                    continue
-
-                call_diffs = (calls['strike'] - underlying_price).abs()
-                call_idx = call_diffs.idxmin()
-                call_iv = calls.loc[call_idx, 'impliedVolatility']
-
-                put_diffs = (puts['strike'] - underlying_price).abs()
-                put_idx = put_diffs.idxmin()
-                put_iv = puts.loc[put_idx, 'impliedVolatility']
-
-                atm_iv_value = (call_iv + put_iv) / 2.0
-                atm_iv[exp_date] = atm_iv_value
-
-                if i == 0:
-                    call_bid = calls.loc[call_idx, 'bid']
-                    call_ask = calls.loc[call_idx, 'ask']
-                    put_bid = puts.loc[put_idx, 'bid']
-                    put_ask = puts.loc[put_idx, 'ask']
-                    
-                    if call_bid is not None and call_ask is not None:
-                        call_mid = (call_bid + call_ask) / 2.0
-                    else:
-                        call_mid = None
-
-                    if put_bid is not None and put_ask is not None:
-                        put_mid = (put_bid + put_ask) / 2.0
-                    else:
-                        put_mid = None
-
-                    if call_mid is not None and put_mid is not None:
-                        straddle = (call_mid + put_mid)
-
-                i += 1
+            with self.spans.span("atm_iv", ticker):
+                atm_dates, ivs, straddle = atm_term_structure(options_chains, underlying_price)
             
-            if not atm_iv:
+            if not atm_dates:
                 return "Error: Could not determine ATM IV for any expiration dates."
             
-            today = datetime.today().date()
-            dtes = []
-            ivs = []
-            for exp_date, iv in atm_iv.items():
-                exp_date_obj = datetime.strptime(exp_date, "%Y-%m-%d").date()
-                days_to_expiry = (exp_date_obj - today).days
-                dtes.append(days_to_expiry)
-                ivs.append(iv)
-            
-            term_spline = self.build_term_structure(dtes, ivs)
+            dtes = [(datetime.strptime(exp_date, "%Y-%m-%d").date() - today).days for exp_date in atm_dates]
             
-            ts_slope_0_45 = (term_spline(45) - term_spline(dtes[0])) / (45-dtes[0])
-            
-            price_history = stock.history(period='3mo')
-            iv30_rv30 = term_spline(30) / self.yang_zhang(price_history)
-
-            avg_volume = price_history['Volume'].rolling(30).mean().dropna().iloc[-1]
+            with self.spans.span("term_structure", ticker):
+                term_spline = self.build_term_structure(dtes, ivs)
+                iv45, iv_front, iv30 = term_spline([45, dtes[0], 30]).tolist()
+            ts_slope_0_45 = (iv45 - iv_front) / (45-dtes[0])
+
+            #Once the chains are in, the remaining metrics are a lookup and arithmetic, so they are recorded before the
+            #slope and IV/RV gates and refilter can loosen those thresholds later
+            rv30 = self.lookup_realized(ticker, 'yang_zhang')
+            if rv30 is None:
+                with self.spans.span("yang_zhang", ticker):
+                    rv30 = self.yang_zhang(price_history)
+            iv30_rv30 = iv30 / rv30
 
             expected_move = str(round(straddle / underlying_price * 100,2)) + "%" if straddle else None
 
-            return {'avg_volume': avg_volume, 'iv30_rv30': iv30_rv30, 'ts_slope_0_45': ts_slope_0_45, 'expected_move': expected_move} #Check that they are in our desired range (see video)
+            data = {'avg_volume': avg_volume, 'iv30_rv30': iv30_rv30, 'ts_slope_0_45': ts_slope_0_45, 'expected_move': expected_move}
+            if self.early_reject:
+                for stage in ("ts_slope_0_45", "iv30_rv30"):
+                    if self.stageFails(stage, data[stage]):
+                        return {**data, 'rejected_at': stage}
+
+            return data #Check that they are in our desired range (see video)
         except Exception as e:
             print(f"[{ticker}] -- {e}")
             return f"Error: {e}"
@@ -0,0 +1,82 @@
+import numpy as np
+
+#Linear term structure of ATM IV over days to expiry. Between the first and last expiry the knots and the arithmetic
+#follow scipy's interp1d(kind='linear') step for step, so the numbers match the closure build_term_structure used to
+#return; outside that range the IV is held flat at the nearest end.
+
+def bracket(days, tenors):
+    #Knot pair the linear interpolation reads for each tenor: the first knot at or after it, kept off both ends
+    hi = np.clip(np.searchsorted(days, tenors), 1, len(days) - 1)
+    return hi - 1, hi
+
+def _interpolate(days, ivs, lo, hi, tenors):
+    x_lo = days[lo]
+    y_lo = ivs[lo]
+    slope = (ivs[hi] - y_lo) / (days[hi] - x_lo)
+    return slope * (tenors - x_lo) + y_lo
+
+class TermStructure:
+    def __init__(self, days, ivs):
+        days = np.array(days)
+        ivs = np.array(ivs, dtype=np.float64)
+        if len(days) < 2 or len(days) != len(ivs):
+            raise ValueError(f"Term structure needs at least 2 matching expiries, got {len(days)} days and {len(ivs)} IVs")
+
+        sort_idx = days.argsort()
+        self.days = days[sort_idx]
+        self.ivs = ivs[sort_idx]
+
+    def __call__(self, tenors):
+        tenors = np.asarray(tenors)
+        lo, hi = bracket(self.days, tenors)
+        values = _interpolate(self.days, self.ivs, lo, hi, tenors)
+        values = np.where(tenors < self.days[0], self.ivs[0], values)
+        values = np.where(tenors > self.days[-1], self.ivs[-1], values)
+        if values.ndim == 0:
+            return float(values)
+        return values
+
+    @classmethod
+    def batch(cls, days_list, ivs_list):
+        return TermStructureBatch(days_list, ivs_list)
+
+class TermStructureBatch:
+    #Many tickers' term structures padded into one block: days past a ticker's last expiry are +inf so they never
+    #count as below a tenor, and counts holds each row's real length. Rows with fewer than 2 expiries evaluate to NaN.
+    def __init__(self, days_list, ivs_list):
+        days_list = [np.array(d) for d in days_list]
+        ivs_list = [np.array(v, dtype=np.float64) for v in ivs_list]
+        rows = len(days_list)
+        width = max((len(d) for d in days_list), default=0)
+
+        self.days = np.full((rows, max(width, 2)), np.inf)
+        self.ivs = np.full((rows, max(width, 2)), np.nan)
+        self.counts = np.zeros(rows, dtype=np.int64)
+        for row, (days, ivs) in enumerate(zip(days_list, ivs_list)):
+            if len(days) != len(ivs):
+                raise ValueError(f"Row {row}: {len(days)} days and {len(ivs)} IVs")
+            sort_idx = days.argsort()
+            self.days[row, :len(days)] = days[sort_idx]
+            self.ivs[row, :len(days)] = ivs[sort_idx]
+            self.counts[row] = len(days)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __call__(self, tenors):
+        #Returns one row per ticker and one column per tenor
+        tenors = np.atleast_1d(np.asarray(tenors, dtype=np.float64))
+        rows = np.arange(len(self.counts))[:, None]
+        last = np.maximum(self.counts - 1, 1)[:, None]
+
+        below = (self.days[:, :, None] < tenors[None, None, :]).sum(axis=1)
+        hi = np.clip(below, 1, last)
+        lo = hi - 1
+        with np.errstate(invalid="ignore"):
+            values = _interpolate(self.days, self.ivs, (rows, lo), (rows, hi), tenors)
+
+        first_day = self.days[:, :1]
+        last_day = np.take_along_axis(self.days, last, axis=1)
+        values = np.where(tenors < first_day, self.ivs[:, :1], values)
+        values = np.where(tenors > last_day, np.take_along_axis(self.ivs, last, axis=1), values)
+        return np.where((self.counts >= 2)[:, None], values, np.nan)
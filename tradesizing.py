@@ -1,39 +1,89 @@
-import time
-from datetime import timedelta
-from typing import List, Dict
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import pandas as pd
-import requests
-import paperconfig as paperconfig
+from alpacaclient import shared_client
+from occsymbols import StrikeIndex
 
 class TradingDataCollector:
     BASE_STOCK = "https://data.alpaca.markets/v2/stocks"
-    BASE_OPTIONS = "https://data.alpaca.markets/v1beta1/options"
+    CONTRACTS = "https://paper-api.alpaca.markets/v2/options/contracts"
+    CONTRACTS_PAGE_SIZE = 1000
+    FRONT_WEEKS = 5
+    BACK_OFFSET_DAYS = 28
 
-    def __init__(self, screener_df, date):
+    def __init__(self, screener_df, date, concurrency=1, client=None):
         if "Ticker" not in screener_df.columns:
             raise ValueError("Input DataFrame must contain a 'Ticker' column.")
 
         self.df = screener_df.reset_index(drop=True)
         self.date = date
-        self.rate_limit_delay = 0.25
-        self.max_retries = 8
-        self.max_wait_time = 60
         self.wiggle = 10
-        self.hdr = paperconfig.header
+        self.concurrency = max(1, int(concurrency))
+        self.client = client if client is not None else shared_client()
 
+    #Requests are paced by the Alpaca client's token bucket rather than a sleep per ticker. With concurrency above 1 tickers are
+    #sized on a pool of concurrency + 1 threads under an asyncio semaphore (the extra thread pulls screener rows when
+    #streaming); results are gathered in ticker order, so rows come out the same as the sequential loop.
     def run(self):
-        rows: List[Dict] = []
-
-        for tk in self.df["Ticker"]:
-            try:
-                snap = self.collect_ticker_information(tk)
-                if snap:
-                    rows.append(snap)
-            except Exception as e:
-                print(f"[{tk}] skipped - {e}")
-
-            time.sleep(self.rate_limit_delay)
+        tickers = list(self.df["Ticker"])
+        if self.concurrency > 1:
+            snaps = asyncio.run(self.size_all_async(tickers))
+        else:
+            snaps = [self.size_ticker(tk) for tk in tickers]
+
+        return self.merge_sized([snap for snap in snaps if snap])
+
+    def run_stream(self, screened_rows):
+        if self.concurrency > 1:
+            received, snaps = asyncio.run(self.size_stream_async(screened_rows))
+        else:
+            received = []
+            snaps = []
+            for screened in screened_rows:
+                received.append(screened)
+                snaps.append(self.size_ticker(screened["Ticker"]))
+
+        self.df = pd.DataFrame(received, columns=self.df.columns)
+        return self.merge_sized([snap for snap in snaps if snap])
+
+    def sizing_pool(self):
+        #The loop's default executor can have as few as 5 threads, fewer than the semaphore would let through
+        return ThreadPoolExecutor(max_workers=self.concurrency + 1, thread_name_prefix="sizer")
+
+    async def size_ticker_async(self, tk, semaphore, pool):
+        async with semaphore:
+            return await asyncio.get_running_loop().run_in_executor(pool, self.size_ticker, tk)
+
+    async def size_all_async(self, tickers):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        with self.sizing_pool() as pool:
+            return await asyncio.gather(*(self.size_ticker_async(tk, semaphore, pool) for tk in tickers))
+
+    async def size_stream_async(self, screened_rows):
+        #The screener's generator blocks while it works, so each row is pulled on a thread and sizing starts right away
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        rows = iter(screened_rows)
+        received = []
+        tasks = []
+        with self.sizing_pool() as pool:
+            while True:
+                screened = await loop.run_in_executor(pool, next, rows, None)
+                if screened is None:
+                    break
+                received.append(screened)
+                tasks.append(asyncio.create_task(self.size_ticker_async(screened["Ticker"], semaphore, pool)))
+            return received, await asyncio.gather(*tasks)
+
+    def size_ticker(self, tk):
+        try:
+            return self.collect_ticker_information(tk)
+        except Exception as e:
+            print(f"[{tk}] skipped - {e}")
+            return None
 
+    def merge_sized(self, rows):
         if not rows:
             return self.df
 
@@ -85,92 +135,80 @@ class TradingDataCollector:
         return data["trade"]["p"]
 
     def get_expiry_dates(self, ticker, price):
+        #One contracts listing covers every expiry the front and back legs can come from. The weekly expiry of a week is
+        #its last listed date, so holiday-shifted Thursday expiries stand in for their Friday. Front is the first week
+        #from this Friday's with calls near the money, back is the week four weeks after the front expiry.
         today = self.date.date()
         initialOffset = (4 - today.weekday() + 7) % 7
         firstFriday = today + timedelta(days=initialOffset)
+        lastFront = firstFriday + timedelta(weeks=self.FRONT_WEEKS - 1)
+        lastBack = lastFront + timedelta(days=self.BACK_OFFSET_DAYS)
+        lastBack += timedelta(days=6 - lastBack.weekday())
+
+        weekly = self.weekly_expiries(self.contracts_by_expiry(ticker, price, today, lastBack))
 
         frontDate = None
-        frontOptions = None
-
-        for i in range(5):
-            candidate = firstFriday + timedelta(weeks=i)
-            candStr = candidate.strftime("%Y-%m-%d")
-            options = self.gather_options(ticker, candStr, price)
-            if options:
-                frontDate, frontOptions = candidate, options
+        for i in range(self.FRONT_WEEKS):
+            frontDate = weekly.get((firstFriday + timedelta(weeks=i)).isocalendar()[:2])
+            if frontDate is not None:
                 break
 
         if frontDate is None:
             return None, None, None, None
-        
-        backDate = None
-        backOptions = None
-
-        offsets = [28, 27] #Optimize later
 
-        for offset in offsets:
-            candidate = frontDate + timedelta(days=offset)
-            candStr = candidate.strftime("%Y-%m-%d")
-            options = self.gather_options(ticker, candStr, price)
-            if options:
-                backDate, backOptions = candidate, options
-                break
+        backDate = weekly.get((frontDate[0] + timedelta(days=self.BACK_OFFSET_DAYS)).isocalendar()[:2])
 
         if backDate is None:
             return None, None, None, None
 
-        return (frontDate.strftime("%Y-%m-%d"), backDate.strftime("%Y-%m-%d"), frontOptions, backOptions)
-
-    def gather_options(self, ticker, expiry, price):
-        lo = max(price - self.wiggle, 0)
-        hi = price + self.wiggle
-        url = (f"{self.BASE_OPTIONS}/snapshots/{ticker}?limit=100&type=call&feed=indicative&expiration_date={expiry}&strike_price_gte={lo}&strike_price_lte={hi}")
-        
-        js = self.getURLData(url)
-       
-        snaps = js.get("snapshots", {}) if js else {}
-        return list(snaps.keys())
+        return (frontDate[0].strftime("%Y-%m-%d"), backDate[0].strftime("%Y-%m-%d"), frontDate[1], backDate[1])
+
+    def weekly_expiries(self, by_expiry):
+        weekly = {}
+        for expiry in sorted(by_expiry):
+            day = datetime.strptime(expiry, "%Y-%m-%d").date()
+            weekly[day.isocalendar()[:2]] = (day, by_expiry[expiry])
+        return weekly
+
+    def contracts_by_expiry(self, ticker, price, date_from, date_to):
+        by_expiry = {}
+        for contract in self.list_contracts(ticker, price, date_from, date_to):
+            if contract.get("root_symbol", ticker) != ticker or contract.get("tradable") is False:
+                continue
+            by_expiry.setdefault(contract["expiration_date"], []).append(contract["symbol"])
+        return by_expiry
+
+    def list_contracts(self, ticker, price, date_from, date_to):
+        params = {
+            "underlying_symbols": ticker,
+            "type": "call",
+            "expiration_date_gte": date_from.strftime("%Y-%m-%d"),
+            "expiration_date_lte": date_to.strftime("%Y-%m-%d"),
+            "strike_price_gte": max(price - self.wiggle, 0),
+            "strike_price_lte": price + self.wiggle,
+            "limit": self.CONTRACTS_PAGE_SIZE,
+        }
+        contracts = []
+        while True:
+            js = self.client.get(self.CONTRACTS, params=params)
+            if not js:
+                break
+            contracts.extend(js.get("option_contracts") or [])
+            if not js.get("next_page_token"):
+                break
+            params["page_token"] = js["next_page_token"]
+        return contracts
 
     def at_the_money_common_strike(self, front_syms, back_syms, spot):
-
-        def get_price(sym):
-            return int(sym[-8:]) / 1000
-
-        front_map = {get_price(s): s for s in front_syms}
-        back_map  = {get_price(s): s for s in back_syms}
-
-        common = sorted(set(front_map) & set(back_map), key=lambda k: abs(k - spot))
-
-        if not common:
+        #Strike listed at both expiries closest to spot, with the front and back symbols for it
+        try:
+            return StrikeIndex(front_syms, back_syms).nearest(spot) #Returned as a tuple
+        except ValueError as e:
+            print(f"Unreadable Option Symbol - {e}")
             return None
 
-        k = common[0]
-        return k, front_map[k], back_map[k] #Returned as a tuple
-
     def getURLData(self, url):
-        for attempt in range(self.max_retries):
-            try:
-                r = requests.get(url, headers=self.hdr, timeout=10)
-
-                if r.status_code == 404:
-                    return None
-
-                if r.status_code == 429:
-                    wait = min(self.max_wait_time, self.rate_limit_delay * (2 ** attempt))
-                    print(f"[429 Error] waiting {wait} seconds - {url}")
-                    time.sleep(wait)
-                    continue
-
-                r.raise_for_status()
-                return r.json()
-
-            except requests.RequestException as e:
-                if attempt == self.max_retries - 1:
-                    print(f"[ERROR] {url} - {e}")
-                    return None
-                time.sleep(self.rate_limit_delay * (2 ** attempt))
-
-        return None
+        return self.client.get(url)
 
 # def main():
 #     screener_df = pd.read_csv("EarningsScanning.csv")
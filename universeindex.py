@@ -0,0 +1,98 @@
+import csv
+import os
+import threading
+import zlib
+from pathlib import Path
+import numpy as np
+
+UNIVERSE_CSV = Path(__file__).resolve().with_name("NasdaqAndNYSETradedStocks.csv")
+UNIVERSE_INDEX = UNIVERSE_CSV.with_suffix(".idx.npy")
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+class UniverseIndex:
+    #Open-addressing hash table of fixed-width ASCII symbols. Empty slots are b"" and the table size is a power of two,
+    #so the array saved by build_index can be memory-mapped and probed directly without rebuilding anything.
+    def __init__(self, table):
+        self.table = table
+        self.mask = len(table) - 1
+        self.width = table.dtype.itemsize
+
+    @classmethod
+    def from_symbols(cls, symbols):
+        keys = sorted({s.strip().upper().encode("ascii") for s in symbols if s and s.strip()})
+        width = max((len(k) for k in keys), default=1)
+
+        size = 1
+        while size < 2 * len(keys):
+            size *= 2
+
+        table = np.zeros(size, dtype=f"S{width}")
+        mask = size - 1
+        for key in keys:
+            slot = zlib.crc32(key) & mask
+            while table[slot]:
+                slot = (slot + 1) & mask
+            table[slot] = key
+
+        return cls(table)
+
+    def __contains__(self, symbol):
+        try:
+            key = symbol.encode("ascii")
+        except (AttributeError, UnicodeEncodeError):
+            return False
+
+        if not key or len(key) > self.width:
+            return False
+
+        slot = zlib.crc32(key) & self.mask
+        while True:
+            entry = self.table[slot]
+            if not entry:
+                return False
+            if entry == key:
+                return True
+            slot = (slot + 1) & self.mask
+
+    def __len__(self):
+        return int(np.count_nonzero(self.table))
+
+def read_symbols(csv_path=UNIVERSE_CSV):
+    #Read the raw column rather than going through pandas, which turns symbols like NA and NAN into missing values
+    with open(csv_path, newline="") as f:
+        return [row["Ticker"] for row in csv.DictReader(f)]
+
+def build_index(csv_path=UNIVERSE_CSV, index_path=UNIVERSE_INDEX):
+    index = UniverseIndex.from_symbols(read_symbols(csv_path))
+
+    tmp_path = Path(f"{index_path}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, index.table)
+    os.replace(tmp_path, index_path)
+
+    return index
+
+def load_universe(csv_path=UNIVERSE_CSV, index_path=UNIVERSE_INDEX):
+    key = (str(csv_path), str(index_path))
+    with _load_lock:
+        if key not in _loaded:
+            _loaded[key] = _open_index(Path(csv_path), Path(index_path))
+        return _loaded[key]
+
+def _open_index(csv_path, index_path):
+    if index_path.exists() and index_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        return UniverseIndex(np.load(index_path, mmap_mode="r"))
+
+    try:
+        build_index(csv_path, index_path)
+    except OSError as e:
+        print(f"[universeindex] Could not write {index_path} - {e}")
+        return UniverseIndex.from_symbols(read_symbols(csv_path))
+
+    return UniverseIndex(np.load(index_path, mmap_mode="r"))
+
+if __name__ == "__main__":
+    idx = build_index()
+    print(f"Indexed {len(idx)} Symbols Into {UNIVERSE_INDEX.name} ({idx.table.nbytes} Bytes)")
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+OHLCV = ("Open", "High", "Low", "Close", "Volume")
+
+#The rolling kernels below replay pandas' own fixed-window algorithm (Kahan-compensated adds and removes, the
+#repeated-value shortcut, inf treated as missing) one column at a time across every row of the block, so a ticker
+#gets bit-for-bit the same numbers here as it does from Series.rolling(window).sum() / .mean().
+
+def _prep(values):
+    values = np.array(values, dtype=np.float64, ndmin=2)
+    values[np.isinf(values)] = np.nan
+    return values
+
+def _kahan(total, comp, val, valid):
+    y = val - comp
+    t = total + y
+    return np.where(valid, t, total), np.where(valid, (t - total) - y, comp)
+
+def _roll(values, window, mean):
+    values = _prep(values)
+    n, T = values.shape
+    out = np.full((n, T), np.nan)
+    if T == 0:
+        return out
+
+    total = np.zeros(n)
+    comp_add = np.zeros(n)
+    comp_remove = np.zeros(n)
+    nobs = np.zeros(n, dtype=np.int64)
+    neg_ct = np.zeros(n, dtype=np.int64)
+    same = np.zeros(n, dtype=np.int64)
+    prev = values[:, 0].copy()
+
+    for i in range(T):
+        if i >= window:
+            old = values[:, i - window]
+            valid = ~np.isnan(old)
+            nobs -= valid
+            neg_ct -= valid & np.signbit(old)
+            total, comp_remove = _kahan(total, comp_remove, -old, valid)
+
+        val = values[:, i]
+        valid = ~np.isnan(val)
+        nobs += valid
+        neg_ct += valid & np.signbit(val)
+        total, comp_add = _kahan(total, comp_add, val, valid)
+        same = np.where(valid, np.where(val == prev, same + 1, 1), same)
+        prev = np.where(valid, val, prev)
+
+        ready = nobs >= window
+        repeated = same >= nobs
+        if mean:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                res = total / nobs
+            res = np.where((neg_ct == 0) & (res < 0), 0.0, res)
+            res = np.where((neg_ct == nobs) & (res > 0), 0.0, res)
+            res = np.where(repeated, prev, res)
+            out[:, i] = np.where(ready & (nobs > 0), res, np.nan)
+        else:
+            out[:, i] = np.where(ready, np.where(repeated, prev * nobs, total), np.nan)
+
+    return out
+
+def rolling_sum(values, window):
+    return _roll(values, window, mean=False)
+
+def rolling_mean(values, window):
+    return _roll(values, window, mean=True)
+
+def last_valid(values):
+    values = np.array(values, dtype=np.float64, ndmin=2)
+    present = ~np.isnan(values)
+    last = values.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+    picked = values[np.arange(len(values)), last]
+    return np.where(present.any(axis=1), picked, np.nan)
+
+def yang_zhang_batch(open_, high, low, close, window=30, trading_periods=252, return_last_only=True):
+    open_, high, low, close = (np.array(a, dtype=np.float64, ndmin=2) for a in (open_, high, low, close))
+
+    prev_close = np.full_like(close, np.nan)
+    prev_close[:, 1:] = close[:, :-1]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_ho = np.log(high / open_)
+        log_lo = np.log(low / open_)
+        log_co = np.log(close / open_)
+
+        log_oc = np.log(open_ / prev_close)
+        log_oc_sq = log_oc**2
+
+        log_cc = np.log(close / prev_close)
+        log_cc_sq = log_cc**2
+
+        rs = log_ho * (log_ho - log_co) + log_lo * (log_lo - log_co)
+
+        close_vol = rolling_sum(log_cc_sq, window) * (1.0 / (window - 1.0))
+        open_vol = rolling_sum(log_oc_sq, window) * (1.0 / (window - 1.0))
+        window_rs = rolling_sum(rs, window) * (1.0 / (window - 1.0))
+
+        k = 0.34 / (1.34 + ((window + 1) / (window - 1)) )
+        result = np.sqrt(open_vol + k * close_vol + (1 - k) * window_rs) * np.sqrt(trading_periods)
+
+    if return_last_only:
+        return result[:, -1]
+    return result
+
+def average_volume_batch(volume, window=30):
+    return last_valid(rolling_mean(volume, window))
+
+def stack_histories(histories):
+    #Right-align each ticker's own bars and left-pad with NaN. Missing leading values are skipped by the rolling
+    #kernels exactly like absent rows, so every ticker keeps the numbers its standalone history would give.
+    tickers = list(histories)
+    depth = max((len(df) for df in histories.values()), default=0)
+    block = {col: np.full((len(tickers), depth), np.nan) for col in OHLCV}
+    for row, tk in enumerate(tickers):
+        df = histories[tk]
+        if len(df) == 0:
+            continue
+        for col in OHLCV:
+            block[col][row, depth - len(df):] = df[col].to_numpy(dtype=np.float64)
+    return tickers, block
+
+def realized_metrics(histories, window=30, trading_periods=252):
+    tickers, block = stack_histories(histories)
+    if not tickers:
+        return pd.DataFrame(columns=["yang_zhang", "avg_volume"], dtype=float)
+
+    return pd.DataFrame({
+        "yang_zhang": yang_zhang_batch(block["Open"], block["High"], block["Low"], block["Close"], window, trading_periods),
+        "avg_volume": average_volume_batch(block["Volume"], window),
+    }, index=tickers)